@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from yarl import URL
+
+from src.Resources.utils import load_config
+from src.Scraping.ListingParser import get_listing_parser
+from src.Scraping.Replay import FixtureRecorder, ReplayServer, load_fixture_index
+from src.Scraping.Scraper import Scraper
+from src.Scraping.URLBuilder import URLBuilder
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), '../Resources')
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+# Number of listings on a generated search page, as on olx.pl
+SYNTHETIC_LISTINGS_PER_PAGE = 40
+POLISH_MONTHS = ["stycznia", "lutego", "marca", "kwietnia", "maja", "czerwca", "lipca", "sierpnia", "września",
+                 "października", "listopada", "grudnia"]
+
+
+def create_scraper(config: dict, work_dir: str, **scraper_options) -> Scraper:
+    """
+    Creates a Scraper for the search queries of the configuration, keeping its history, database and cache
+    in a working directory so that benchmarking does not touch the application's resources.
+    :param config: Application configuration.
+    :param work_dir: Working directory of the Scraper.
+    :param scraper_options: Options overriding the scraper_config section of the configuration.
+    :return: Scraper object.
+    """
+    search_items = [URLBuilder(**query) for query in config['search_queries']]
+    options = {**config.get('scraper_config', {}), 'http_cache': False, 'offline': False, 'incremental': False,
+               **scraper_options}
+    return Scraper(search_items, config['gui_config']['page_limit'], resources_dir=work_dir, **options)
+
+
+async def record(config: dict, fixtures_dir: str) -> None:
+    """
+    Scrapes OLX once and records the raw responses into the fixtures directory.
+    :param config: Application configuration.
+    :param fixtures_dir: Directory to store the recorded responses in.
+    :return:
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        scraper = create_scraper(config, work_dir, record_dir=fixtures_dir)
+        try:
+            await scraper.scrape_data()
+        finally:
+            await scraper.close()
+    print(f"Recorded {len(load_fixture_index(fixtures_dir))} pages into {fixtures_dir}")
+
+
+def synthetic_page(query: str, page: int, total: int, rng: random.Random) -> str:
+    """
+    Generates an OLX-style search page with the markup of the listing cards the parsers read.
+    :param query: Search query of the page.
+    :param page: Page number.
+    :param total: Total number of listings of the query.
+    :param rng: Random number generator, seeded so that the generated pages are the same on every run.
+    :return: HTML content of the page.
+    """
+    start = (page - 1) * SYNTHETIC_LISTINGS_PER_PAGE
+    cards = []
+    for number in range(start, min(start + SYNTHETIC_LISTINGS_PER_PAGE, total)):
+        slug = f"{query.replace(' ', '-')}-{number}"
+        price = f"{rng.randrange(100, 20000)} zł" + ("<span>do negocjacji</span>" if rng.random() < 0.3 else "")
+        date = f"{rng.randrange(1, 29)} {rng.choice(POLISH_MONTHS)} 2024"
+        cards.append(f"""
+    <div data-cy="l-card" id="{number}" class="css-1sw7q4x">
+        <div class="css-qfzx1y"><a class="css-rc5s2u" href="/d/oferta/{slug}-CID767-ID{number}.html">
+            <div class="css-gl6djm"><img src="https://ireland.apollo.olxcdn.com/v1/files/{slug}/image;s=216x152"
+                alt="{query}" class="css-8wsg1m"></div>
+        </a></div>
+        <div class="css-u2ayx9"><a href="/d/oferta/{slug}-CID767-ID{number}.html">
+            <h6 class="css-16v5mdi">{query.capitalize()} {number} &ndash; stan bardzo dobry</h6></a>
+            <p data-testid="ad-price" class="css-10b0gli">{price}</p>
+        </div>
+        <p data-testid="location-date" class="css-veheph">Wrocław, Krzyki - {date}</p>
+    </div>""")
+    return (f'<!DOCTYPE html><html lang="pl"><head><meta charset="utf-8"><title>{query} | OLX.pl</title></head>'
+            f'<body><div data-testid="listing-grid"><span data-testid="total-count">Znaleźliśmy {total} ogłoszeń'
+            f'</span>{"".join(cards)}</div></body></html>')
+
+
+def generate_fixtures(config: dict, fixtures_dir: str, seed: int = 0) -> None:
+    """
+    Generates synthetic responses of the search queries of the configuration into the fixtures directory, so that
+    the benchmark runs offline without recording responses from olx.pl first.
+    :param config: Application configuration.
+    :param fixtures_dir: Directory to store the generated responses in.
+    :param seed: Seed of the generated prices and dates.
+    :return:
+    """
+    rng = random.Random(seed)
+    recorder = FixtureRecorder(fixtures_dir)
+    page_limit = config['gui_config']['page_limit']
+    for query in config['search_queries']:
+        url_builder = URLBuilder(**query)
+        total = page_limit * SYNTHETIC_LISTINGS_PER_PAGE
+        for page in range(1, page_limit + 1):
+            # Recorded under the URL as aiohttp normalizes it, like the responses recorded by the Scraper
+            recorder.record(str(URL(url_builder.build_url(page))),
+                            synthetic_page(url_builder.item_query, page, total, rng))
+    print(f"Generated {len(load_fixture_index(fixtures_dir))} synthetic pages into {fixtures_dir}")
+
+
+async def run_scrape(config: dict, fixtures_dir: str, trace_memory: bool) -> dict[str, float]:
+    """
+    Runs a full scrape against a ReplayServer serving the recorded responses.
+    :param config: Application configuration.
+    :param fixtures_dir: Directory with the recorded responses.
+    :param trace_memory: If True, the peak memory allocated during the scrape is measured.
+    :return: Dictionary with the measured statistics.
+    """
+    server = ReplayServer(fixtures_dir)
+    base_url = await server.start()
+    with tempfile.TemporaryDirectory() as work_dir:
+        scraper = create_scraper(config, work_dir, base_url=base_url)
+        try:
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            data_frames = await scraper.scrape_data()
+            elapsed = time.perf_counter() - start
+            peak_memory = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+            await scraper.close()
+            await server.stop()
+    listings = sum(len(df) for df in data_frames.values())
+    return {'seconds': elapsed, 'pages': server.requests_served, 'bytes': server.bytes_served, 'listings': listings,
+            'peak_memory': peak_memory}
+
+
+def measure_parse_time(fixtures_dir: str, parser_name: str) -> float:
+    """
+    Measures the average time of parsing a recorded page in the current process.
+    :param fixtures_dir: Directory with the recorded responses.
+    :param parser_name: Name of the parser backend.
+    :return: Average parse time per page in milliseconds.
+    """
+    parser = get_listing_parser(parser_name)
+    pages = []
+    for filename in load_fixture_index(fixtures_dir).values():
+        with open(os.path.join(fixtures_dir, filename), 'r', encoding='utf-8') as file:
+            pages.append(file.read())
+    start = time.perf_counter()
+    for html in pages:
+        parser.parse(html)
+    return (time.perf_counter() - start) * 1000 / len(pages) if pages else 0.0
+
+
+def benchmark(config: dict, fixtures_dir: str, repeat: int) -> None:
+    """
+    Benchmarks the Scraper against the recorded responses and prints the results. Synthetic responses are
+    generated on the first run if none were recorded.
+    :param config: Application configuration.
+    :param fixtures_dir: Directory with the recorded responses.
+    :param repeat: Number of timed scrapes, the fastest one is reported.
+    :return:
+    """
+    if not load_fixture_index(fixtures_dir):
+        generate_fixtures(config, fixtures_dir)
+    runs = [asyncio.run(run_scrape(config, fixtures_dir, trace_memory=False)) for _ in range(repeat)]
+    best = min(runs, key=lambda run: run['seconds'])
+    peak_memory = asyncio.run(run_scrape(config, fixtures_dir, trace_memory=True))['peak_memory']
+    parser_name = config.get('scraper_config', {}).get('parser', 'lxml')
+    parse_time = measure_parse_time(fixtures_dir, parser_name)
+
+    print(f"Scrape time:   {best['seconds']:.3f} s (best of {repeat})")
+    print(f"Pages:         {best['pages']} ({best['pages'] / best['seconds']:.1f} pages/s)")
+    print(f"Listings:      {best['listings']} ({best['listings'] / best['seconds']:.1f} listings/s)")
+    print(f"Transferred:   {best['bytes'] / 1024:.1f} KiB")
+    print(f"Parse time:    {parse_time:.2f} ms/page ({parser_name})")
+    print(f"Peak memory:   {peak_memory / 1024 / 1024:.2f} MiB")
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Benchmark the Scraper against recorded OLX responses.")
+    argument_parser.add_argument('--config', default=os.path.join(RESOURCES_DIR, 'config.json'),
+                                 help="Configuration file with the search queries")
+    argument_parser.add_argument('--fixtures', default=FIXTURES_DIR, help="Directory with the recorded responses")
+    argument_parser.add_argument('--record', action='store_true', help="Record fresh responses from olx.pl")
+    argument_parser.add_argument('--repeat', type=int, default=3, help="Number of timed scrapes")
+    arguments = argument_parser.parse_args()
+
+    benchmark_config = load_config(arguments.config)
+    if arguments.record:
+        asyncio.run(record(benchmark_config, arguments.fixtures))
+    else:
+        benchmark(benchmark_config, arguments.fixtures, arguments.repeat)
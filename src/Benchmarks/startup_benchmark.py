@@ -0,0 +1,82 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+MODULES = ['src.Scraping.Scraper', 'src.Exporting.ExportManager', 'src.cli', 'src.GUI.MainWindow']
+IMPORT_TIME_PATTERN = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def parse_import_times(report: str) -> list[tuple[str, int, int]]:
+    """
+    Parses the report printed by python -X importtime.
+    :param report: Standard error output of the interpreter.
+    :return: List of (module name, self time, cumulative time) tuples, the times are in microseconds.
+    """
+    import_times = []
+    for line in report.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if match:
+            import_times.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return import_times
+
+
+def measure_import(module: str) -> list[tuple[str, int, int]]:
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+    :param module: Name of the module to import.
+    :return: List of (module name, self time, cumulative time) tuples of every module that was imported.
+    """
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR, 'QT_QPA_PLATFORM': 'offscreen'}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Importing {module} failed:\n{result.stderr.splitlines()[-1]}")
+    return parse_import_times(result.stderr)
+
+
+def time_per_package(import_times: list[tuple[str, int, int]]) -> dict[str, int]:
+    """
+    Sums the self time of the imported modules per top-level package.
+    :param import_times: List of (module name, self time, cumulative time) tuples.
+    :return: Dictionary with the import time of each package in microseconds.
+    """
+    package_times = defaultdict(int)
+    for name, self_time, _ in import_times:
+        package_times[name.split('.')[0]] += self_time
+    return package_times
+
+
+def benchmark(modules: list[str], repeat: int, top: int) -> None:
+    """
+    Measures the cold import time of the modules and prints the packages that take the longest to load.
+    :param modules: Names of the modules to import.
+    :param repeat: Number of measurements per module, the fastest one is reported.
+    :param top: Number of the slowest packages to print per module.
+    :return:
+    """
+    for module in modules:
+        try:
+            runs = [measure_import(module) for _ in range(repeat)]
+        except Exception as e:
+            print(f"{module}: {e}\n")
+            continue
+        best = min(runs, key=lambda import_times: import_times[-1][2])
+        print(f"{module}: {best[-1][2] / 1000:.1f} ms (best of {repeat}), {len(best)} modules")
+        package_times = sorted(time_per_package(best).items(), key=lambda item: item[1], reverse=True)
+        for package, package_time in package_times[:top]:
+            print(f"    {package:<24} {package_time / 1000:8.1f} ms")
+        print()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Benchmark the cold import time of the application.")
+    argument_parser.add_argument('modules', nargs='*', default=MODULES, help="Modules to import")
+    argument_parser.add_argument('--repeat', type=int, default=5, help="Number of measurements per module")
+    argument_parser.add_argument('--top', type=int, default=10, help="Number of the slowest packages to print")
+    arguments = argument_parser.parse_args()
+
+    benchmark(arguments.modules, arguments.repeat, arguments.top)
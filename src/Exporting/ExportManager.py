@@ -1,9 +1,8 @@
+import os
 from enum import Enum
-from fpdf import FPDF
 import pandas as pd
-import json
-import dicttoxml
-from src.Exporting.SpreadsheetManager import SpreadsheetManager
+from src.Exporting.Exporter import Exporter, ExcelExporter, CsvExporter, PdfExporter, JsonExporter, XmlExporter, \
+    ParquetExporter, ArrowExporter
 
 
 class ExportFormat(Enum):
@@ -13,6 +12,20 @@ class ExportFormat(Enum):
     PDF = "pdf"
     JSON = "json"
     XML = "xml"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+# Exporter classes by format, a new format only needs an ExportFormat member and an entry here
+EXPORTERS: dict[ExportFormat, type[Exporter]] = {
+    ExportFormat.EXCEL: ExcelExporter,
+    ExportFormat.CSV: CsvExporter,
+    ExportFormat.PDF: PdfExporter,
+    ExportFormat.JSON: JsonExporter,
+    ExportFormat.XML: XmlExporter,
+    ExportFormat.PARQUET: ParquetExporter,
+    ExportFormat.ARROW: ArrowExporter,
+}
 
 
 class ExportManager:
@@ -38,103 +51,51 @@ class ExportManager:
 
     def export_data(self) -> None:
         """
-        Exports the data to the specified format.
+        Exports the data to the specified format with the exporter registered for it.
+        If the exporter writes a file per query key, or split_by_query is set in the output configuration,
+        the files of the query keys are written in parallel.
         :return:
         """
-
-        if self.export_format == ExportFormat.EXCEL:
-            self._export_to_excel()
-        elif self.export_format == ExportFormat.CSV:
-            self._export_to_csv()
-        elif self.export_format == ExportFormat.PDF:
-            self._export_to_pdf()
-        elif self.export_format == ExportFormat.JSON:
-            self._export_to_json()
-        elif self.export_format == ExportFormat.XML:
-            self._export_to_xml()
-        else:
+        exporter_class = EXPORTERS.get(self.export_format)
+        if exporter_class is None:
             raise ValueError(f"Unsupported export format: {self.export_format}")
+        if exporter_class.file_per_query or self.output_config.get('split_by_query'):
+            self._export_per_query(exporter_class)
+        else:
+            write_export(exporter_class, self.output_filename, self.output_config, self.data_frames)
 
-    def _export_to_excel(self) -> None:
-        """
-        Exports the data to an Excel file.
-        :return:
-        """
-        spreadsheet_manager = SpreadsheetManager(self.data_frames, self.output_filename)
-        spreadsheet_manager.initialize_spreadsheets(set(self.output_config['hyperlinked_columns']),
-                                                    self.output_config['format_column_widths'])
-
-    def _export_to_csv(self) -> None:
+    def _export_per_query(self, exporter_class: type[Exporter]) -> None:
         """
-        Exports the data to a CSV file.
+        Exports every query key to its own file, fanned out over up to export_workers workers of the exporter's pool,
+        at most one per query key.
+        :param exporter_class: Class of the exporter
         :return:
         """
+        jobs = []
         for key, df in self.data_frames.items():
-            filename = f"{self.output_filename}_{key}.csv"
-            df.to_csv(filename, index=False)
-
-    def _export_to_pdf(self) -> None:
-        """
-        Exports the data to a PDF file.
-        :return:
-        """
-        try:
-            pdf = FPDF(orientation='L', unit='mm', format=(594, 841))  # A1 dimensions: 594 mm x 841 mm
-            pdf.add_page()
-            pdf.set_font('Arial', 'B', 12)
-
-            pdf.set_auto_page_break(auto=True, margin=15)
-
-            col_widths = {}
-            for key, df in self.data_frames.items():
-                for col in df.columns:
-                    col_widths[col] = pdf.get_string_width(col) + 4
-                    for val in df[col]:
-                        col_width = pdf.get_string_width(str(val)) + 4
-                        if col_width > col_widths[col]:
-                            col_widths[col] = col_width
-
-                pdf.add_page()
-                pdf.set_font('Arial', '', 10)
-                pdf.cell(400, 10, txt=str(key), ln=True, align='C')
-
-                for col in df.columns:
-                    pdf.cell(col_widths[col], 10, col.encode('latin1', 'replace').decode('latin1'), border=1)
-                pdf.ln()
-
-                for index, row in df.iterrows():
-                    if pdf.get_y() > pdf.page_break_trigger - 20:
-                        pdf.add_page()
-                        for col in df.columns:
-                            pdf.cell(col_widths[col], 10, col.encode('latin1', 'replace').decode('latin1'), border=1)
-                        pdf.ln()
-                    for col in df.columns:
-                        pdf.cell(col_widths[col], 10, str(row[col]).encode('latin1', 'replace').decode('latin1'),
-                                 border=1)
-                    pdf.ln()
-
-            pdf_output_path = f"{self.output_filename}.pdf"
-            pdf.output(pdf_output_path)
-        except Exception as e:
-            raise Exception(f"Error exporting to PDF: {e}")
-
-    def _export_to_json(self) -> None:
-        """
-        Exports the data to a JSON file.
-        :return:
-        """
-        json_data = {key: df.to_dict(orient='records') for key, df in self.data_frames.items()}
-        with open(f"{self.output_filename}.json", 'w', encoding='utf-8') as json_file:
-            json.dump(json_data, json_file, ensure_ascii=False, indent=4)
-        print(f"JSON exported successfully to {self.output_filename}.json")
-
-    def _export_to_xml(self) -> None:
-        """
-        Exports the data to an XML file.
-        :return:
-        """
-        xml_data = {key: df.to_dict(orient='records') for key, df in self.data_frames.items()}
-        xml_bytes = dicttoxml.dicttoxml(xml_data, custom_root='data', attr_type=False)
-        with open(f"{self.output_filename}.xml", 'wb') as xml_file:
-            xml_file.write(xml_bytes)
-        print(f"XML exported successfully to {self.output_filename}.xml")
+            output_filename = self.output_filename if exporter_class.file_per_query else f"{self.output_filename}_{key}"
+            jobs.append((output_filename, {key: df}))
+        workers = min(self.output_config.get('export_workers') or os.cpu_count() or 1, len(jobs))
+        if workers <= 1:
+            for output_filename, data_frames in jobs:
+                write_export(exporter_class, output_filename, self.output_config, data_frames)
+            return
+
+        with exporter_class.executor_class(max_workers=workers) as executor:
+            futures = [executor.submit(write_export, exporter_class, output_filename, self.output_config, data_frames)
+                       for output_filename, data_frames in jobs]
+            for future in futures:
+                future.result()
+
+
+def write_export(exporter_class: type[Exporter], output_filename: str, output_config: dict,
+                 data_frames: dict[str, pd.DataFrame]) -> None:
+    """
+    Writes data frames with an exporter. A module-level function so that it can run in worker processes.
+    :param exporter_class: Class of the exporter
+    :param output_filename: Path of the output file without the extension
+    :param output_config: The configuration for the output file
+    :param data_frames: The data frames to export
+    :return:
+    """
+    exporter_class(output_filename, output_config).write(data_frames)
@@ -0,0 +1,638 @@
+import functools
+import json
+import multiprocessing
+import os
+import textwrap
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Sequence, TextIO
+
+import numpy as np
+import pandas as pd
+
+from src.Exporting.formatting import parse_date
+from src.Exporting.layout import FontMetrics, font_column_widths
+
+# Unicode fonts tried for PDF exports when pdf_font_path is not configured
+PDF_FONT_PATHS = [
+    'C:/Windows/Fonts/arial.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+]
+
+
+class SpawnProcessPoolExecutor(ProcessPoolExecutor):
+    """
+    Process pool starting its workers with spawn instead of fork. Exports run in processes with running threads,
+    like the Qt GUI and the scraping event loop, and forking those can deadlock the workers.
+    """
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        """
+        Initializes the SpawnProcessPoolExecutor.
+        :param max_workers: Maximum number of worker processes
+        """
+        super().__init__(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class Exporter(ABC):
+    """Base class for writing the scraped data frames to a file."""
+    # If True, the exporter always writes a file per query key, named after the key
+    file_per_query = False
+    # Pool used to write the files of several query keys in parallel, threads unless the exporter holds the GIL
+    executor_class: type[Executor] = ThreadPoolExecutor
+
+    def __init__(self, output_filename: str, output_config: dict) -> None:
+        """
+        Initializes the Exporter.
+        :param output_filename: Path of the output file without the extension
+        :param output_config: The configuration for the output file
+        """
+        self.output_filename = output_filename
+        self.output_config = output_config
+        self._temporary_paths: dict[str, str] = {}
+
+    def write(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames into temporary files, which are renamed to their final names once the export
+        succeeded, so a failed or interrupted export never leaves a truncated file behind.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+        try:
+            self.export(data_frames)
+        except BaseException:
+            for temporary_path in self._temporary_paths:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+            raise
+        finally:
+            temporary_paths, self._temporary_paths = self._temporary_paths, {}
+        for temporary_path, path in temporary_paths.items():
+            os.replace(temporary_path, path)
+
+    def temporary_path(self, path: str) -> str:
+        """
+        Returns a temporary path to write an output file to, in the same directory so that it can be renamed atomically.
+        The extension is kept for libraries that infer the format from it.
+        :param path: Final path of the output file
+        :return: Temporary path of the output file
+        """
+        directory, filename = os.path.split(path)
+        root, extension = os.path.splitext(filename)
+        temporary_path = os.path.join(directory, f".{root}.{uuid.uuid4().hex[:8]}.tmp{extension}")
+        self._temporary_paths[temporary_path] = path
+        return temporary_path
+
+    @abstractmethod
+    def export(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+
+
+class StreamingExporter(Exporter):
+    """
+    Base class for exporters that write the output incrementally: a header per data frame, the rows in batches,
+    then finalize the file. Only one batch of rows is converted at a time, so memory does not grow with the export.
+    """
+    batch_size = 10000
+
+    def __init__(self, output_filename: str, output_config: dict) -> None:
+        """
+        Initializes the StreamingExporter.
+        :param output_filename: Path of the output file without the extension
+        :param output_config: The configuration for the output file
+        """
+        super().__init__(output_filename, output_config)
+        self._file: Optional[TextIO] = None
+
+    def export(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames batch by batch.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+        try:
+            for key, df in data_frames.items():
+                self.write_header(key, list(df.columns))
+                for start in range(0, len(df), self.batch_size):
+                    self.write_rows(df.iloc[start:start + self.batch_size])
+            self.finalize()
+        finally:
+            self.close()
+
+    @abstractmethod
+    def write_header(self, key: str, columns: list[str]) -> None:
+        """
+        Starts the output of a data frame.
+        :param key: The query key of the data frame
+        :param columns: The columns of the data frame
+        :return:
+        """
+
+    @abstractmethod
+    def write_rows(self, rows: pd.DataFrame) -> None:
+        """
+        Writes a batch of rows of the current data frame.
+        :param rows: The rows to write
+        :return:
+        """
+
+    @abstractmethod
+    def finalize(self) -> None:
+        """
+        Completes the output after all data frames were written.
+        :return:
+        """
+
+    def close(self) -> None:
+        """
+        Closes the open output file, also called when the export fails.
+        :return:
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CsvExporter(StreamingExporter):
+    """Exporter writing a CSV file per data frame."""
+    file_per_query = True
+
+    def write_header(self, key: str, columns: list[str]) -> None:
+        """
+        Opens the CSV file of a query key and writes the column names.
+        :param key: The query key of the data frame
+        :param columns: The columns of the data frame
+        :return:
+        """
+        self.close()
+        path = self.temporary_path(f"{self.output_filename}_{key}.csv")
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        pd.DataFrame(columns=columns).to_csv(self._file, index=False)
+
+    def write_rows(self, rows: pd.DataFrame) -> None:
+        """
+        Appends the rows to the CSV file.
+        :param rows: The rows to write
+        :return:
+        """
+        rows.to_csv(self._file, header=False, index=False)
+
+    def finalize(self) -> None:
+        """
+        Closes the last CSV file.
+        :return:
+        """
+        self.close()
+
+
+class JsonExporter(StreamingExporter):
+    """Exporter writing a JSON object mapping each query key to the list of its listings."""
+    def __init__(self, output_filename: str, output_config: dict) -> None:
+        """
+        Initializes the JsonExporter.
+        :param output_filename: Path of the output file without the extension
+        :param output_config: The configuration for the output file
+        """
+        super().__init__(output_filename, output_config)
+        self.path = f"{output_filename}.json"
+        self._keys_written = 0
+        self._rows_written = 0
+
+    def write_header(self, key: str, columns: list[str]) -> None:
+        """
+        Starts the list of listings of a query key.
+        :param key: The query key of the data frame
+        :param columns: The columns of the data frame
+        :return:
+        """
+        if self._file is None:
+            self._file = open(self.temporary_path(self.path), 'w', encoding='utf-8')
+        else:
+            self._end_key()
+        self._file.write("{\n" if not self._keys_written else ",\n")
+        self._file.write(f"    {json.dumps(key, ensure_ascii=False)}: [")
+        self._keys_written += 1
+        self._rows_written = 0
+
+    def write_rows(self, rows: pd.DataFrame) -> None:
+        """
+        Writes a JSON object per row, indented as json.dump does it.
+        :param rows: The rows to write
+        :return:
+        """
+        for record in rows.to_dict(orient='records'):
+            self._file.write("\n" if not self._rows_written else ",\n")
+            self._file.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=4), ' ' * 8))
+            self._rows_written += 1
+
+    def finalize(self) -> None:
+        """
+        Closes the JSON object.
+        :return:
+        """
+        if self._file is None:
+            self._file = open(self.temporary_path(self.path), 'w', encoding='utf-8')
+            self._file.write("{}")
+        else:
+            self._end_key()
+            self._file.write("\n}")
+        self.close()
+        print(f"JSON exported successfully to {self.path}")
+
+    def _end_key(self) -> None:
+        """
+        Closes the list of listings of the current query key.
+        :return:
+        """
+        self._file.write("\n    ]" if self._rows_written else "]")
+
+
+class XmlExporter(StreamingExporter):
+    """Exporter writing an XML document with an element per query key holding an item element per listing."""
+    def __init__(self, output_filename: str, output_config: dict) -> None:
+        """
+        Initializes the XmlExporter.
+        :param output_filename: Path of the output file without the extension
+        :param output_config: The configuration for the output file
+        """
+        super().__init__(output_filename, output_config)
+        self.path = f"{output_filename}.xml"
+        self._element: Optional[str] = None
+
+    def write_header(self, key: str, columns: list[str]) -> None:
+        """
+        Starts the element of a query key.
+        :param key: The query key of the data frame
+        :param columns: The columns of the data frame
+        :return:
+        """
+        import dicttoxml
+
+        self._end_element()
+        # Query keys are turned into element names the same way dicttoxml does it for dictionary keys
+        self._element, attributes = dicttoxml.make_valid_xml_name(key, {})
+        self._file.write(f"<{self._element}{dicttoxml.make_attrstring(attributes)}>")
+
+    def write_rows(self, rows: pd.DataFrame) -> None:
+        """
+        Writes an item element per row.
+        :param rows: The rows to write
+        :return:
+        """
+        import dicttoxml
+
+        xml_bytes = dicttoxml.dicttoxml(rows.to_dict(orient='records'), root=False, attr_type=False)
+        self._file.write(xml_bytes.decode('utf-8'))
+
+    def finalize(self) -> None:
+        """
+        Closes the root element of the document.
+        :return:
+        """
+        self._end_element()
+        self._file.write("</data>")
+        self.close()
+        print(f"XML exported successfully to {self.path}")
+
+    def _end_element(self) -> None:
+        """
+        Opens the document before the first element, or closes the element of the previous query key.
+        :return:
+        """
+        if self._file is None:
+            self._file = open(self.temporary_path(self.path), 'w', encoding='utf-8')
+            self._file.write('<?xml version="1.0" encoding="UTF-8" ?><data>')
+        elif self._element is not None:
+            self._file.write(f"</{self._element}>")
+
+
+class ColumnarExporter(StreamingExporter):
+    """
+    Base class for exporters writing all data frames to a single typed Arrow table with zstd compression.
+    The query key of each row is stored in a dictionary-encoded Query column and every batch is written as its own
+    row group or record batch, so readers can select a query without scanning the whole file. Requires pyarrow.
+    """
+    extension = ""
+    batch_size = 100000
+    # Columns stored with a type other than string, by Arrow type name
+    typed_columns = {"Price": "int64", "Date": "date32"}
+
+    def __init__(self, output_filename: str, output_config: dict) -> None:
+        """
+        Initializes the ColumnarExporter.
+        :param output_filename: Path of the output file without the extension
+        :param output_config: The configuration for the output file, may set the compression codec
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise Exception(f"Exporting to {self.extension} requires pyarrow, install it with: pip install pyarrow")
+        super().__init__(output_filename, output_config)
+        self.path = f"{output_filename}.{self.extension}"
+        self.compression = output_config.get('compression', 'zstd')
+        self._writer = None
+        self._schema = None
+        self._keys = None
+        self._key_index = 0
+
+    def export(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames batch by batch. All query keys share one dictionary of the Query column,
+        as Arrow IPC files do not allow replacing it between batches. Queries without results have no columns
+        and are left out, so they don't determine or break the schema of the file.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+        import pyarrow as pa
+
+        data_frames = {key: df for key, df in data_frames.items() if not df.empty}
+        self._keys = pa.array(list(data_frames), pa.string())
+        super().export(data_frames)
+
+    def write_header(self, key: str, columns: list[str]) -> None:
+        """
+        Starts the rows of a query key. The schema of the file is taken from the first non-empty data frame.
+        :param key: The query key of the data frame
+        :param columns: The columns of the data frame
+        :return:
+        """
+        import pyarrow as pa
+
+        schema = pa.schema([pa.field("Query", pa.dictionary(pa.int32(), pa.string()))] +
+                           [pa.field(column, pa.type_for_alias(self.typed_columns.get(column, "string")))
+                            for column in columns])
+        if self._writer is None:
+            self._schema = schema
+            self._writer = self._open_writer(self.temporary_path(self.path), schema)
+        elif not schema.equals(self._schema):
+            raise Exception(f"Columns of {key} do not match the columns of the previous data frames")
+        self._key_index = self._keys.index(key).as_py()
+
+    def write_rows(self, rows: pd.DataFrame) -> None:
+        """
+        Converts the rows to typed Arrow arrays and writes them.
+        :param rows: The rows to write
+        :return:
+        """
+        import pyarrow as pa
+
+        indices = pa.array(np.full(len(rows), self._key_index, dtype=np.int32))
+        arrays = [pa.DictionaryArray.from_arrays(indices, self._keys)]
+        for field in self._schema:
+            if field.name == "Query":
+                continue
+            values = rows[field.name]
+            if pa.types.is_date(field.type):
+                values = values.map(parse_date)
+            elif pa.types.is_integer(field.type):
+                values = pd.to_numeric(values, errors='coerce').astype('Int64')
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def finalize(self) -> None:
+        """
+        Writes the file footer.
+        :return:
+        """
+        import pyarrow as pa
+
+        if self._writer is None:  # No data frames, the file only holds the Query column
+            schema = pa.schema([pa.field("Query", pa.dictionary(pa.int32(), pa.string()))])
+            self._writer = self._open_writer(self.temporary_path(self.path), schema)
+        self.close()
+        print(f"{self.extension.capitalize()} exported successfully to {self.path}")
+
+    def close(self) -> None:
+        """
+        Closes the writer.
+        :return:
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        super().close()
+
+    @abstractmethod
+    def _open_writer(self, path: str, schema):
+        """
+        Opens the writer of the output file.
+        :param path: Path of the file
+        :param schema: Arrow schema of the file
+        :return: Writer with write_table and close methods
+        """
+
+
+class ParquetExporter(ColumnarExporter):
+    """Exporter writing a Parquet file."""
+    extension = "parquet"
+
+    def _open_writer(self, path: str, schema):
+        """
+        Opens a Parquet writer.
+        :param path: Path of the file
+        :param schema: Arrow schema of the file
+        :return: Parquet writer
+        """
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema, compression=self.compression)
+
+
+class ArrowExporter(ColumnarExporter):
+    """Exporter writing an Arrow IPC file, readable as Feather v2, e.g. with pandas.read_feather."""
+    extension = "arrow"
+
+    def _open_writer(self, path: str, schema):
+        """
+        Opens an Arrow IPC file writer.
+        :param path: Path of the file
+        :param schema: Arrow schema of the file
+        :return: Arrow IPC file writer
+        """
+        import pyarrow as pa
+
+        return pa.ipc.new_file(path, schema, options=pa.ipc.IpcWriteOptions(compression=self.compression))
+
+
+class ExcelExporter(Exporter):
+    """Exporter writing an Excel workbook with a sheet per data frame."""
+    executor_class = SpawnProcessPoolExecutor  # openpyxl builds the workbook in pure Python
+
+    def export(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames to an Excel file.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+        from src.Exporting.SpreadsheetManager import SpreadsheetManager  # openpyxl is only loaded when needed
+
+        path = self.temporary_path(f"{self.output_filename}.xlsx")
+        spreadsheet_manager = SpreadsheetManager(data_frames, os.path.splitext(path)[0])
+        spreadsheet_manager.initialize_spreadsheets(set(self.output_config['hyperlinked_columns']),
+                                                    self.output_config['format_column_widths'])
+
+
+class PdfExporter(Exporter):
+    """
+    Exporter writing the data frames as PDF tables. Text is rendered with a Unicode TTF font if one is found,
+    so Polish characters are kept.
+    """
+    executor_class = SpawnProcessPoolExecutor  # fpdf lays out the pages in pure Python
+
+    def export(self, data_frames: dict[str, pd.DataFrame]) -> None:
+        """
+        Exports the data frames to a PDF file.
+        :param data_frames: The data frames to export, keyed by the query key
+        :return:
+        """
+        font_path = find_pdf_font(self.output_config.get('pdf_font_path'))
+        try:
+            write_pdf(self.temporary_path(f"{self.output_filename}.pdf"), data_frames, font_path)
+        except Exception as e:
+            raise Exception(f"Error exporting to PDF: {e}")
+
+
+def find_pdf_font(font_path: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the path of the Unicode TTF font used in PDF exports.
+    :param font_path: Path of the font set in the configuration, the common system fonts are tried if None
+    :return: Path of the font, None if no font was found and the latin-1 core font has to be used
+    """
+    for path in ([font_path] if font_path else []) + PDF_FONT_PATHS:
+        if os.path.isfile(path):
+            return path
+    print("No Unicode TTF font found, non latin-1 characters are replaced in the PDF export.")
+    return None
+
+
+def write_pdf(path: str, data_frames: dict[str, pd.DataFrame], font_path: Optional[str]) -> None:
+    """
+    Writes the data frames as tables to a PDF file.
+    :param path: Path of the PDF file
+    :param data_frames: The data frames to write, keyed by the query key
+    :param font_path: Path of the Unicode TTF font, None to use the latin-1 core font
+    :return:
+    """
+    pdf = _fpdf_class()(orientation='L', unit='mm', format=(594, 841))  # A1 dimensions: 594 mm x 841 mm
+    if font_path:
+        pdf.add_font('Unicode', '', font_path, uni=True)  # Embedded once, as a subset of the used characters
+        font_family = 'Unicode'
+    else:
+        font_family = 'Arial'
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    for key, df in data_frames.items():
+        pdf.add_page()
+        pdf.set_font(font_family, '', 10)
+        missing_width = pdf.current_font.get('desc', {}).get('MissingWidth', 0) if font_path else 0
+        char_widths = pdf.current_font['cw'] if font_path else None
+
+        # Every column is converted to strings once, instead of formatting every cell of every row
+        table = pd.DataFrame({column: _encode_pdf_text(df[column].astype(str), char_widths) for column in df.columns})
+        widths = font_column_widths(table, FontMetrics(pdf.current_font['cw'], pdf.font_size, missing_width),
+                                    padding=4)
+        header = list(zip(widths.values(), _encode_pdf_text(pd.Series(df.columns, dtype=str), char_widths)))
+
+        pdf.cell(400, 10, txt=_encode_pdf_text(pd.Series([str(key)]), char_widths)[0], ln=True, align='C')
+        _write_pdf_row(pdf, header)
+        page_break = pdf.page_break_trigger - 20
+        column_widths = list(widths.values())
+        for row in zip(*(table[column].to_numpy() for column in table.columns)):
+            if pdf.get_y() > page_break:
+                pdf.add_page()
+                _write_pdf_row(pdf, header)
+            _write_pdf_row(pdf, zip(column_widths, row))
+
+    if pdf.page == 0:
+        pdf.add_page()
+    pdf.output(path)
+
+
+@functools.lru_cache(maxsize=None)
+def _fpdf_class() -> type:
+    """
+    Returns the FPDF class used for PDF exports. The workarounds for fpdf 1.7.2 are applied here, once per process,
+    and only to that version, since they rely on its internals.
+    :return: The FPDF class
+    """
+    import fpdf.fpdf as fpdf_module
+
+    if fpdf_module.FPDF_VERSION != '1.7.2':
+        return fpdf_module.FPDF
+    # By default add_font pickles the metrics of a TTF font next to the font file and unpickles them on later runs,
+    # which fails in read-only system font directories and trusts whatever file is found there
+    fpdf_module.FPDF_CACHE_MODE = 1
+
+    class GlyphSubsetFPDF(fpdf_module.FPDF):
+        """FPDF keeping the glyph subsets of its TTF fonts in _GlyphSubset lists."""
+        def add_font(self, family, style='', fname='', uni=False) -> None:
+            super().add_font(family, style, fname, uni)
+            for font in self.fonts.values():
+                if font['type'] == 'TTF' and not isinstance(font['subset'], _GlyphSubset):
+                    font['subset'] = _GlyphSubset(font['subset'])
+
+    return GlyphSubsetFPDF
+
+
+class _GlyphSubset(list):
+    """
+    List of the code points used with a TTF font that ignores duplicates. fpdf 1.7.2 appends every rendered
+    character to the subset and tests membership for each of the 65536 code points when embedding the font,
+    which makes the Unicode font slower than the table itself for large exports.
+    """
+    def __init__(self, code_points: list[int]) -> None:
+        """
+        Initializes the _GlyphSubset.
+        :param code_points: Code points already in the subset
+        """
+        super().__init__(dict.fromkeys(code_points))
+        self._members = set(self)
+
+    def __contains__(self, code_point: object) -> bool:
+        return code_point in self._members
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._members = set(self)
+
+    def append(self, code_point: int) -> None:
+        if code_point not in self._members:
+            super().append(code_point)
+            self._members.add(code_point)
+
+
+def _encode_pdf_text(values: pd.Series, char_widths: Optional[Sequence[float]]) -> list[str]:
+    """
+    Prepares strings for the PDF font, replacing the characters it can't render with "?". The latin-1 core font only
+    has latin-1 characters, a TTF font only the characters it has a width for; fpdf 1.7.2 fails on code points above
+    U+FFFF, like emoji.
+    :param values: The strings
+    :param char_widths: Widths of the TTF font indexed by code point, None if the core font is used
+    :return: List of the strings to render
+    """
+    if char_widths is None:
+        return values.str.encode('latin1', errors='replace').str.decode('latin1').tolist()
+    # Only the distinct characters of the column are checked against the font
+    unsupported = {ord(char): '?' for char in set(''.join(values))
+                   if ord(char) >= len(char_widths) or not char_widths[ord(char)]}
+    return values.str.translate(unsupported).tolist() if unsupported else values.tolist()
+
+
+def _write_pdf_row(pdf, cells) -> None:
+    """
+    Writes a row of bordered cells and moves to the next line.
+    :param pdf: The FPDF document
+    :param cells: Pairs of the cell width and text
+    :return:
+    """
+    for width, text in cells:
+        pdf.cell(width, 10, text, border=1)
+    pdf.ln()
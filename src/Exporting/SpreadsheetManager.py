@@ -2,9 +2,17 @@ from typing import Optional
 
 import pandas as pd
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+from src.Exporting.layout import text_column_widths
 
 
 class SpreadsheetManager:
+    hyperlinked_columns_width = 25
+
     def __init__(self, data_frames: pd.Series(dtype=object), filename: str) -> None:
         """
         Initializes the SpreadsheetManager object.
@@ -16,73 +24,79 @@ class SpreadsheetManager:
 
     def initialize_spreadsheets(self, hyperlinked_columns: set[str], format_column_widths: Optional[bool] = True) -> None:
         """
-        Initializes the Excel spreadsheets.
+        Initializes the Excel spreadsheets. The workbook is written in a single pass in openpyxl's write-only mode,
+        with the hyperlinks and column widths computed from the data frames before the rows are written.
         :param hyperlinked_columns: The columns to hyperlink
         :param format_column_widths: Whether to format the column widths
         :return:
         """
-        self._create_spreadsheets()
-        self._apply_hyperlinking(hyperlinked_columns)
-        if format_column_widths:
-            self._format_excel_columns()
+        workbook = openpyxl.Workbook(write_only=True)
+        for key, df in self.data_frames.items():
+            # Excel sheet names can't be longer than 31 characters
+            sheet = workbook.create_sheet(title=key[:31])
+            if format_column_widths:
+                self._format_columns(sheet, df, hyperlinked_columns)
+            self._write_rows(sheet, df, self._get_hyperlinked_columns(key, df, hyperlinked_columns))
+        workbook.save(f"{self.filename}.xlsx")
 
-    def _create_spreadsheets(self) -> None:
+    @staticmethod
+    def _get_hyperlinked_columns(key: str, df: pd.DataFrame, columns_to_hyperlink: set[str]) -> set[str]:
         """
-        Creates the Excel spreadsheets.
-        :return:
+        Returns the columns of the data frame to hyperlink.
+        :param key: The query key of the data frame
+        :param df: The data frame
+        :param columns_to_hyperlink: The columns to hyperlink
+        :return: The columns to hyperlink that are present in the data frame
         """
-        with pd.ExcelWriter(f"{self.filename}.xlsx", engine='openpyxl') as writer:
-            for key, df in self.data_frames.items():
-                # Excel sheet names can't be longer than 31 characters
-                sheet_name = key[:31]
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        if df.empty:
+            return set()
+        for column_name in columns_to_hyperlink:
+            if column_name not in df.columns:
+                print(f"Column {column_name} not found in {key} data frame.")
+        return columns_to_hyperlink & set(df.columns)
 
-    def _format_excel_columns(self) -> None:
+    @staticmethod
+    def _write_rows(sheet: WriteOnlyWorksheet, df: pd.DataFrame, hyperlinked_columns: set[str]) -> None:
         """
-        Formats the Excel columns.
+        Writes the header and the rows of the data frame to the sheet.
+        :param sheet: The Excel sheet to write to
+        :param df: The data frame to write
+        :param hyperlinked_columns: The columns to hyperlink
         :return:
         """
-        workbook = openpyxl.load_workbook(f"{self.filename}.xlsx")
-        for sheet in workbook.worksheets:
-            self._format_columns(sheet)
-        workbook.save(f"{self.filename}.xlsx")
+        # Same header style as pandas.DataFrame.to_excel
+        thin = Side(style='thin')
+        header = []
+        for column_name in df.columns:
+            cell = WriteOnlyCell(sheet, value=column_name)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal='center', vertical='top')
+            header.append(cell)
+        sheet.append(header)
 
-    def _apply_hyperlinking(self, columns_to_hyperlink: set[str]) -> None:
-        """
-        Applies hyperlinking to the specified columns.
-        :param columns_to_hyperlink: The columns to hyperlink
-        :return:
-        """
-        workbook = openpyxl.load_workbook(f"{self.filename}.xlsx")
-        for key, df in self.data_frames.items():
-            sheet_name = key[:31]  # Sheet name truncated to 31 characters
-            sheet = workbook[sheet_name]
-            if not df.empty:
-                for column_name in columns_to_hyperlink:
-                    if column_name in df.columns:
-                        column_index = df.columns.get_loc(column_name) + 1  # Get the Excel column index
-                        for row, value in enumerate(df[column_name], start=2):  # Assuming row 1 is header
-                            cell = sheet.cell(row=row, column=column_index)
-                            cell.value = "LINK"  # Set the display text for the hyperlink
-                            cell.hyperlink = value  # Set the actual URL as the hyperlink
-                            cell.style = "Hyperlink"  # Optional: Applies the hyperlink style
-                    else:
-                        print(f"Column {column_name} not found in {key} data frame.")
-        workbook.save(f"{self.filename}.xlsx")
+        columns = [df[column_name].astype(object).where(df[column_name].notna(), None).tolist()
+                   for column_name in df.columns]
+        link_indices = [index for index, column_name in enumerate(df.columns) if column_name in hyperlinked_columns]
+        for values in zip(*columns):
+            row = list(values)
+            for index in link_indices:
+                if not row[index]:
+                    continue
+                cell = WriteOnlyCell(sheet, value="LINK")  # The display text of the hyperlink
+                cell.hyperlink = row[index]  # The actual URL
+                cell.style = "Hyperlink"
+                row[index] = cell
+            sheet.append(row)
 
-    @staticmethod
-    def _format_columns(sheet) -> None:
+    def _format_columns(self, sheet: WriteOnlyWorksheet, df: pd.DataFrame, hyperlinked_columns: set[str]) -> None:
         """
-        Formats the columns of the Excel sheet.
+        Sets the widths of the columns of the Excel sheet to fit the longest value of each column.
         :param sheet: The Excel sheet to format
+        :param df: The data frame written to the sheet
+        :param hyperlinked_columns: The hyperlinked columns, which get a fixed width
         :return:
         """
-        hyperlinked_columns = {"Item URL", "Photo"}
-        hyperlinked_columns_width = 25
-        for column_cells in sheet.columns:
-            column_title = column_cells[0].value
-            if column_title is not None:
-                column_width = max(
-                    len(str(cell.value)) if column_title not in hyperlinked_columns else hyperlinked_columns_width for
-                    cell in column_cells)
-                sheet.column_dimensions[column_cells[0].column_letter].width = column_width
+        fixed_widths = {column_name: self.hyperlinked_columns_width for column_name in hyperlinked_columns}
+        for index, column_width in enumerate(text_column_widths(df, fixed_widths).values(), start=1):
+            sheet.column_dimensions[get_column_letter(index)].width = column_width
@@ -1,6 +1,8 @@
 import datetime
+import functools
 import locale
 import re
+from typing import Optional
 
 
 def format_price(price: str) -> int:
@@ -26,3 +28,29 @@ def format_location_date(location_date: str) -> tuple[str, str]:
         formatted_date = datetime.datetime.now().strftime("%d %B %Y")
         date = formatted_date
     return location, date
+
+
+POLISH_MONTHS = {
+    month: number for number, names in enumerate([
+        ("stycznia", "styczeń"), ("lutego", "luty"), ("marca", "marzec"), ("kwietnia", "kwiecień"), ("maja", "maj"),
+        ("czerwca", "czerwiec"), ("lipca", "lipiec"), ("sierpnia", "sierpień"), ("września", "wrzesień"),
+        ("października", "październik"), ("listopada", "listopad"), ("grudnia", "grudzień")], start=1)
+    for month in names
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_date(date: str) -> Optional[datetime.date]:
+    """
+    Returns the date of a listing formatted by format_location_date, e.g. "12 maja 2024".
+    Listings share few distinct dates, so the results are cached.
+    :param date: date string
+    :return: parsed date, None if the string is not a date
+    """
+    match = re.search(r'(\d{1,2}) (\w+) (\d{4})', date)
+    if not match or match.group(2).lower() not in POLISH_MONTHS:
+        return None
+    try:
+        return datetime.date(int(match.group(3)), POLISH_MONTHS[match.group(2).lower()], int(match.group(1)))
+    except ValueError:
+        return None
@@ -0,0 +1,97 @@
+from typing import Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+class FontMetrics:
+    """Per-character widths of a font, used to measure whole columns without asking the PDF library for every value."""
+    def __init__(self, char_widths: Union[Mapping[str, float], Sequence[float]], size: float,
+                 default_width: float = 0.0) -> None:
+        """
+        Initializes the FontMetrics.
+        :param char_widths: Width of each character in thousandths of the font size, like the AFM/TTF metrics,
+        either by character or as a list indexed by code point
+        :param size: Font size in the unit the widths are returned in
+        :param default_width: Width of characters missing from char_widths
+        """
+        self.scale = size / 1000
+        self.default_width = default_width
+        # Lookup table of the character widths indexed by code point
+        if isinstance(char_widths, Mapping):
+            self.width_table = np.full(max(map(ord, char_widths), default=0) + 1, default_width, dtype=np.float64)
+            for char, width in char_widths.items():
+                self.width_table[ord(char)] = width
+        else:
+            self.width_table = np.asarray(char_widths, dtype=np.float64)
+
+    def string_widths(self, strings: Sequence[str]) -> np.ndarray:
+        """
+        Returns the widths of strings. All strings are decoded into one array of code points, looked up in the
+        width table and summed per string with numpy.
+        :param strings: The strings to measure
+        :return: Array with the width of each string
+        """
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+        code_points = np.frombuffer(''.join(strings).encode('utf-32-le'), dtype=np.uint32)
+        char_widths = np.where(code_points < len(self.width_table),
+                               self.width_table[np.minimum(code_points, len(self.width_table) - 1)],
+                               self.default_width)
+        cumulative_widths = np.concatenate(([0.0], np.cumsum(char_widths)))
+        ends = np.cumsum(lengths)
+        return (cumulative_widths[ends] - cumulative_widths[ends - lengths]) * self.scale
+
+    def string_width(self, text: str) -> float:
+        """
+        Returns the width of a string.
+        :param text: The string to measure
+        :return: Width of the string
+        """
+        return float(self.string_widths([text])[0])
+
+    def max_width(self, values: pd.Series) -> float:
+        """
+        Returns the width of the widest value of a column. Repeated values, like locations and dates, are measured once.
+        :param values: The column values
+        :return: Width of the widest value, 0 for an empty column
+        """
+        strings = values.astype(str).unique()
+        return float(self.string_widths(strings).max()) if len(strings) else 0.0
+
+
+def text_column_widths(df: pd.DataFrame, fixed_widths: Optional[Mapping[str, float]] = None) -> dict[str, float]:
+    """
+    Returns the width of each column in characters, the length of its longest value or its name.
+    :param df: The data frame
+    :param fixed_widths: Widths of the columns that are not sized to their content
+    :return: Dictionary with the width of each column
+    """
+    fixed_widths = fixed_widths or {}
+    widths = {}
+    for column in df.columns:
+        if column in fixed_widths:
+            widths[column] = fixed_widths[column]
+        else:
+            longest_value = int(df[column].astype(str).str.len().max()) if not df.empty else 0
+            widths[column] = max(len(str(column)), longest_value)
+    return widths
+
+
+def font_column_widths(df: pd.DataFrame, metrics: FontMetrics, padding: float = 0.0,
+                       fixed_widths: Optional[Mapping[str, float]] = None) -> dict[str, float]:
+    """
+    Returns the width of each column when rendered with a font, the width of its widest value or its name.
+    :param df: The data frame
+    :param metrics: Metrics of the font the table is rendered with
+    :param padding: Space added to the width of each column
+    :param fixed_widths: Widths of the columns that are not sized to their content
+    :return: Dictionary with the width of each column
+    """
+    fixed_widths = fixed_widths or {}
+    widths = {}
+    for column in df.columns:
+        if column in fixed_widths:
+            widths[column] = fixed_widths[column]
+        else:
+            widths[column] = max(metrics.string_width(str(column)), metrics.max_width(df[column])) + padding
+    return widths
@@ -1,45 +1,68 @@
 import asyncio
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 
 from src.Scraping.Scraper import Scraper
+from src.Scraping.ScrapeProgress import ScrapeProgress
 
 from src.Exporting.ExportManager import ExportFormat, ExportManager
 from PyQt5.QtCore import QObject, pyqtSlot, pyqtSignal
+from src.GUI.EventLoopThread import EventLoopThread
 from src.GUI.SearchQueriesDialog import SearchQueriesDialog
 
 
 class Controller(QObject):
     """Controller class to handle the communication between the GUI and the Scraper."""
 
-    progress_updated = pyqtSignal(int) # Signa to notify that progress updated
+    progress_updated = pyqtSignal(object)  # Signal carrying the ScrapeProgress of the running scrape
+    batch_scraped = pyqtSignal(str, object)  # Signal carrying the data key and data frame of each scraped page
     scraping_done = pyqtSignal()  # Signal to notify when scraping is done
     scraping_failed = pyqtSignal(str)
+    scraping_cancelled = pyqtSignal()
 
     def __init__(self, scraper: Scraper, output_config: dict[str]) -> None:
         """
-        Initialize the Controller object.
+        Initialize the Controller object and start the thread running the scraping event loop.
         :param scraper: Scraper object to scrape data
         :param output_config: Configuration for the output file
         """
         super().__init__()
         self.scraper = scraper
-        self.loop = asyncio.get_event_loop()
+        self.loop_thread = EventLoopThread()
+        self.loop_thread.start()
         self.output_config = output_config
+        self._scrape_future: Optional[Future] = None
+
+    def is_scraping(self) -> bool:
+        """
+        Check if a scrape is in progress.
+        :return: True if the scraper is running
+        """
+        return self._scrape_future is not None and not self._scrape_future.done()
 
     @pyqtSlot()
     def scrape_data(self) -> None:
         """
-        Scrape data from the URLs and update the progress bar.
+        Start scraping data from the URLs on the event loop thread, so the GUI stays responsive.
+        Progress and results are reported through the signals of the Controller.
+        :return:
+        """
+        if self.is_scraping():
+            return
+        self.progress_updated.emit(ScrapeProgress())
+        self._scrape_future = self.loop_thread.submit(self.scrape_and_update_progress())
+
+    @pyqtSlot()
+    def cancel_scraping(self) -> None:
+        """
+        Cancel the scrape in progress. Data from the previous scrape is kept.
         :return:
         """
-        self.progress_updated.emit(0)
-        self.loop.run_until_complete(self.scrape_and_update_progress())
-        if self.scraping_failed:
-            self.progress_updated.emit(0)
-        else:
-            self.progress_updated.emit(100)
+        if self.is_scraping():
+            self._scrape_future.cancel()
 
     async def scrape_and_update_progress(self) -> dict[str, pd.DataFrame]:
         """
@@ -47,12 +70,30 @@ class Controller(QObject):
         :return: Data frames of the scraped data
         """
         try:
-            await self.scraper.scrape_data(self.progress_updated.emit)
+            await self.scraper.scrape_data(self.progress_updated.emit, self.batch_scraped.emit)
             self.scraping_done.emit()
+            if self.scraper.failed_queries:
+                self.scraping_failed.emit("\n".join(f"{key}: {error}" for key, error in
+                                                     self.scraper.failed_queries.items()))
+        except asyncio.CancelledError:
+            self.progress_updated.emit(ScrapeProgress())
+            self.scraping_cancelled.emit()
+            raise
         except Exception as e:
+            self.progress_updated.emit(ScrapeProgress())
             self.scraping_failed.emit(str(e))
         return self.scraper.data_frames
 
+    def shutdown(self) -> None:
+        """
+        Cancel the scrape in progress, release the resources held by the Scraper, such as its pooled HTTP connections,
+        and stop the event loop thread.
+        :return:
+        """
+        self.cancel_scraping()
+        self.loop_thread.submit(self.scraper.close()).result()
+        self.loop_thread.stop()
+
     def export_data(self, format: str, directory: str) -> None:
         """
         Export the scraped data to a file.
@@ -67,6 +108,18 @@ class Controller(QObject):
         export_manager = ExportManager(export_format, self.output_config, self.scraper.data_frames)
         export_manager.export_data()
 
+    def remove_listing(self, data_key: str, label: object) -> None:
+        """
+        Remove a listing deleted in the table from the scraped data, so it is left out of exports.
+        The data frame is replaced rather than modified, since the table models display it.
+        :param data_key: Data key of the query the listing was found by
+        :param label: Index label of the listing in the data frame
+        :return:
+        """
+        data_frames = self.scraper.data_frames
+        if data_key in data_frames and label in data_frames[data_key].index:
+            data_frames[data_key] = data_frames[data_key].drop(label)
+
     def view_search_queries(self) -> None:
         """
         Open the dialog to view and view/edit the search queries.
@@ -1,13 +1,25 @@
 from typing import Optional, Union
 
-from PyQt5 import QtCore
+import numpy as np
+from PyQt5 import QtCore, QtGui
 import pandas as pd
 from PyQt5.QtCore import QModelIndex
 
 
 class DataFrameModel(QtCore.QAbstractTableModel):
+    """
+    Table model displaying a DataFrame. The cells are served from per-column numpy arrays instead of the DataFrame,
+    the display strings of a column are computed once on first use, and the rows are handed to the view in batches
+    through canFetchMore/fetchMore, so large tables open without rendering every row.
+    The DataFrame itself is never modified or copied: sorting, filtering and removing rows only change the array of
+    the positions of the displayed rows.
+    """
     DtypeRole = QtCore.Qt.UserRole + 1000
     ValueRole = QtCore.Qt.UserRole + 1001
+    # Number of rows the view gets at a time, more are fetched when it is scrolled to the bottom
+    fetch_batch_size = 1000
+
+    row_removed = QtCore.pyqtSignal(object)  # Signal carrying the index label of a row removed from the model
 
     def __init__(self, df: Optional[pd.DataFrame] = pd.DataFrame(),
                  parent: Optional[QtCore.QAbstractTableModel] = None) -> None:
@@ -17,10 +29,7 @@ class DataFrameModel(QtCore.QAbstractTableModel):
         :param parent: The parent QObject
         """
         super(DataFrameModel, self).__init__(parent)
-        self._dataframe = df
-        self._original_dataframe = df.copy()
-        self._last_sorted_column: Optional[int] = None
-        self._sort_order: Optional[QtCore.Qt.SortOrder] = None
+        self._load_data_frame(df)
 
     def set_data_frame(self, dataframe: pd.DataFrame) -> None:
         """
@@ -29,18 +38,97 @@ class DataFrameModel(QtCore.QAbstractTableModel):
         :return:
         """
         self.beginResetModel()
-        self._dataframe = dataframe.copy()
-        self._original_dataframe = dataframe.copy()
-        self._last_sorted_column = None
-        self._sort_order = None
+        self._load_data_frame(dataframe)
+        self.endResetModel()
+
+    def update_data_frame(self, dataframe: pd.DataFrame) -> None:
+        """
+        Replace the DataFrame to be displayed, keeping the sorting, like while the rows of a scrape are streamed in.
+        The row filter and the removed rows are reset, since they refer to the rows of the previous DataFrame
+        :param dataframe: DataFrame to be displayed
+        :return:
+        """
+        sort_columns = self._sort_columns
+        self.beginResetModel()
+        self._load_data_frame(dataframe)
+        self._sort_columns = sort_columns
+        self._update_rows()
         self.endResetModel()
 
+    def _load_data_frame(self, dataframe: pd.DataFrame) -> None:
+        """
+        Caches the values and the dtypes of the columns of the DataFrame as numpy arrays and resets the sorting and
+        the removed rows. The display strings and the sort keys are computed on first use.
+        :param dataframe: DataFrame to be displayed
+        :return:
+        """
+        self._dataframe = dataframe
+        self._values = [dataframe.iloc[:, column].to_numpy() for column in range(dataframe.columns.size)]
+        self._dtypes = list(dataframe.dtypes)
+        self._display_values: dict[int, np.ndarray] = {}
+        self._sort_keys: dict[int, tuple[np.ndarray, int]] = {}
+        # Cached row permutations by the sorted columns and their orders
+        self._permutations: dict[tuple[tuple[int, QtCore.Qt.SortOrder], ...], np.ndarray] = {}
+        self._sort_columns: list[tuple[int, QtCore.Qt.SortOrder]] = []
+        self._removed = np.zeros(len(dataframe.index), dtype=bool)
+        self._row_filter: Optional[np.ndarray] = None
+        # Positions in the DataFrame of the displayed rows, in display order
+        self._rows = np.arange(len(dataframe.index))
+        self._loaded_rows = min(len(self._rows), self.fetch_batch_size)
+
+    def _display_column(self, column: int) -> np.ndarray:
+        """
+        Get the display strings of a column, stringified all at once the first time the column is shown
+        :param column: Index of the column
+        :return: Array with the display string of each row of the DataFrame
+        """
+        display_values = self._display_values.get(column)
+        if display_values is None:
+            display_values = self._dataframe.iloc[:, column].astype(str).to_numpy()
+            self._display_values[column] = display_values
+        return display_values
+
+    def _sort_key(self, column: int) -> tuple[np.ndarray, int]:
+        """
+        Get the sort key of a column, the rank of each value among the sorted unique values of the column, computed
+        the first time the column is sorted. Missing values get the highest rank.
+        :param column: Index of the column
+        :return: Array with the rank of the value of each row of the DataFrame and the rank of the missing values
+        """
+        sort_key = self._sort_keys.get(column)
+        if sort_key is None:
+            ranks, uniques = pd.factorize(self._dataframe.iloc[:, column], sort=True)
+            ranks[ranks < 0] = len(uniques)
+            sort_key = self._sort_keys[column] = ranks, len(uniques)
+        return sort_key
+
+    def _permutation(self, sort_columns: list[tuple[int, QtCore.Qt.SortOrder]]) -> np.ndarray:
+        """
+        Get the positions of the rows of the DataFrame sorted by the given columns, computed once per combination
+        of columns and orders.
+        :param sort_columns: Columns to sort by, with their orders, the first one is the primary
+        :return: Array with the positions of the rows in sorted order
+        """
+        permutation = self._permutations.get(tuple(sort_columns))
+        if permutation is None:
+            keys = []
+            for column, order in sort_columns:
+                ranks, missing_rank = self._sort_key(column)
+                if order == QtCore.Qt.DescendingOrder:
+                    # Reverse the ranks, but keep the missing values last
+                    ranks = np.where(ranks == missing_rank, missing_rank, missing_rank - 1 - ranks)
+                keys.append(ranks)
+            # lexsort is stable and sorts by the last key first
+            permutation = np.lexsort(keys[::-1])
+            self._permutations[tuple(sort_columns)] = permutation
+        return permutation
+
     def data_frame(self) -> pd.DataFrame:
         """
-        Get the DataFrame being displayed
+        Get the DataFrame being displayed, with the rows in display order
         :return: DataFrame being displayed
         """
-        return self._dataframe
+        return self._dataframe.iloc[self._rows]
 
     dataFrame = QtCore.pyqtProperty(pd.DataFrame, fget=data_frame, fset=set_data_frame)
 
@@ -58,7 +146,7 @@ class DataFrameModel(QtCore.QAbstractTableModel):
             if orientation == QtCore.Qt.Horizontal:
                 return self._dataframe.columns[section]
             else:
-                return str(self._dataframe.index[section])
+                return str(self._dataframe.index[self._rows[section]])
         return QtCore.QVariant()
 
     def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
@@ -69,7 +157,32 @@ class DataFrameModel(QtCore.QAbstractTableModel):
         """
         if parent.isValid():
             return 0
-        return len(self._dataframe.index)
+        return self._loaded_rows
+
+    def canFetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        """
+        Check if there are rows of the DataFrame that were not handed to the view yet
+        :param parent: Parent index
+        :return: If more rows can be fetched
+        """
+        if parent.isValid():
+            return False
+        return self._loaded_rows < len(self._rows)
+
+    def fetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> None:
+        """
+        Hand the next batch of rows to the view
+        :param parent: Parent index
+        :return:
+        """
+        if parent.isValid():
+            return
+        rows = min(len(self._rows) - self._loaded_rows, self.fetch_batch_size)
+        if rows <= 0:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._loaded_rows, self._loaded_rows + rows - 1)
+        self._loaded_rows += rows
+        self.endInsertRows()
 
     def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
         """
@@ -88,60 +201,88 @@ class DataFrameModel(QtCore.QAbstractTableModel):
         :param role: Role of the data
         :return: Data for the given index and role
         """
-        if not index.isValid() or not (0 <= index.row() < self.rowCount() and 0 <= index.column() < self.columnCount()):
+        if not index.isValid():
+            return QtCore.QVariant()
+        row, column = index.row(), index.column()
+        if not (0 <= row < self._loaded_rows and 0 <= column < len(self._values)):
             return QtCore.QVariant()
-
-        val = self._dataframe.iloc[index.row(), index.column()]
 
         if role == QtCore.Qt.DisplayRole:
-            if isinstance(val, str) and (
-                    val.startswith("http://") or val.startswith("https://") or val.startswith("/app")):
-                return val  # For simplicity, just return the URL. Custom delegate will handle it
-            return str(val)
+            # URLs are displayed as they are, the custom delegate handles them
+            return self._display_column(column)[self._rows[row]]
         elif role == DataFrameModel.ValueRole:
-            return val
+            return self._values[column][self._rows[row]]
         elif role == DataFrameModel.DtypeRole:
-            return self._dataframe.dtypes[index.column()]
+            return self._dtypes[column]
         return QtCore.QVariant()
 
     def sort(self, column: int, order: Optional[QtCore.Qt.SortOrder] = QtCore.Qt.AscendingOrder) -> None:
         """
-        Sort the model by the given column and order
+        Sort the model by the given column. Clicking a column cycles it through ascending, descending and unsorted,
+        with Shift held the column is added to the current sort as a secondary key instead of replacing it.
         :param column: Column to sort by
-        :param order: Order to sort in
+        :param order: Order to sort in, ignored in favor of the cycle
         :return:
         """
-        colname = self._dataframe.columns[column]
+        add_column = bool(QtGui.QGuiApplication.keyboardModifiers() & QtCore.Qt.ShiftModifier)
+        sort_columns = [sort_column for sort_column in self._sort_columns if add_column or sort_column[0] == column]
+        position = next((i for i, (sorted_column, _) in enumerate(sort_columns) if sorted_column == column), None)
 
         # Determine sorting order
-        if self._last_sorted_column == column:
-            if self._sort_order == QtCore.Qt.AscendingOrder:
-                order = QtCore.Qt.DescendingOrder
-            elif self._sort_order == QtCore.Qt.DescendingOrder:
-                self.reset_sorting()
-                self._last_sorted_column = None
-                self._sort_order = None
-                return
-            else:
-                order = QtCore.Qt.AscendingOrder
+        if position is None:
+            sort_columns.append((column, QtCore.Qt.AscendingOrder))
+        elif sort_columns[position][1] == QtCore.Qt.AscendingOrder:
+            sort_columns[position] = (column, QtCore.Qt.DescendingOrder)
         else:
-            order = QtCore.Qt.AscendingOrder
-
-        self._last_sorted_column = column
-        self._sort_order = order
+            del sort_columns[position]
+        self.sort_by(sort_columns)
 
+    def sort_by(self, sort_columns: list[tuple[int, QtCore.Qt.SortOrder]]) -> None:
+        """
+        Sort the model by several columns. The row permutation is cached, so sorting by the same columns again only
+        reorders the displayed rows.
+        :param sort_columns: Columns to sort by, with their orders, the first one is the primary, empty to reset
+        :return:
+        """
         self.layoutAboutToBeChanged.emit()
-        self._dataframe.sort_values(by=colname, ascending=order == QtCore.Qt.AscendingOrder, inplace=True)
+        self._sort_columns = list(sort_columns)
+        self._update_rows()
         self.layoutChanged.emit()
 
+    def set_row_filter(self, row_filter: Optional[np.ndarray]) -> None:
+        """
+        Show only the rows of the DataFrame matching a filter, in the current sort order
+        :param row_filter: Boolean array with True for each row of the DataFrame to show, None to show all rows
+        :return:
+        """
+        self.beginResetModel()
+        self._row_filter = row_filter
+        self._update_rows()
+        self._loaded_rows = min(len(self._rows), self.fetch_batch_size)
+        self.endResetModel()
+
+    def _update_rows(self) -> None:
+        """
+        Update the positions of the displayed rows from the sorting, the row filter and the removed rows
+        :return:
+        """
+        rows = self._permutation(self._sort_columns) if self._sort_columns else np.arange(len(self._dataframe.index))
+        hidden = self._removed if self._row_filter is None else self._removed | ~self._row_filter
+        self._rows = rows[~hidden[rows]]
+
+    def total_row_count(self) -> int:
+        """
+        Get the number of rows displayed once all of them are fetched
+        :return: Number of rows not filtered out or removed
+        """
+        return len(self._rows)
+
     def reset_sorting(self) -> None:
         """
         Reset the sorting of the model
         :return:
         """
-        self.layoutAboutToBeChanged.emit()
-        self._dataframe = self._original_dataframe.copy()
-        self.layoutChanged.emit()
+        self.sort_by([])
 
     def roleNames(self) -> dict:
         """
@@ -160,8 +301,12 @@ class DataFrameModel(QtCore.QAbstractTableModel):
         :return: If the row was removed
         """
         if 0 <= row < self.rowCount():
+            position = self._rows[row]
             self.beginRemoveRows(parent, row, row)
-            self._dataframe.drop(self._dataframe.index[row], inplace=True)
+            self._removed[position] = True
+            self._rows = np.delete(self._rows, row)
+            self._loaded_rows -= 1
             self.endRemoveRows()
+            self.row_removed.emit(self._dataframe.index[position])
             return True
         return False
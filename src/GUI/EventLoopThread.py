@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Coroutine, Any, Optional
+
+from PyQt5.QtCore import QThread, QObject
+
+
+class EventLoopThread(QThread):
+    """Thread running an asyncio event loop, so that scraping does not block the Qt GUI thread."""
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        """
+        Initialize the thread and its event loop. The loop starts running once the thread is started.
+        :param parent: Parent QObject.
+        """
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self) -> None:
+        """
+        Run the event loop until it is stopped.
+        :return:
+        """
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """
+        Schedule a coroutine on the event loop from any thread.
+        :param coroutine: Coroutine to run.
+        :return: Future of the coroutine result, cancelling it cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self) -> None:
+        """
+        Stop the event loop and wait for the thread to finish.
+        :return:
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.wait()
+        self.loop.close()
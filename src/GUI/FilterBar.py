@@ -0,0 +1,162 @@
+from typing import Optional
+
+import pandas as pd
+from PyQt5.QtCore import QDate, QTimer
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLineEdit, QSpinBox, QDateEdit, QLabel, QPushButton
+
+from src.GUI.DataFrameModel import DataFrameModel
+from src.GUI.ListingFilter import ListingFilter, ListingFilterCriteria
+
+
+class FilterBar(QWidget):
+    """Bar of filters over a listings table: title search, location, price range and date range."""
+    # Delay after the last change before the table is filtered, so typing doesn't filter on every keystroke
+    filter_delay_ms = 150
+    max_price = 100_000_000
+
+    def __init__(self, df: pd.DataFrame, model: DataFrameModel, parent: Optional[QWidget] = None) -> None:
+        """
+        Initializes the filter bar.
+        :param df: Data frame displayed by the model.
+        :param model: Model of the table to filter.
+        :param parent: Parent widget.
+        """
+        super().__init__(parent)
+        self.model = model
+        self.listing_filter = ListingFilter(df)
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(self.filter_delay_ms)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.init_ui()
+
+    def init_ui(self) -> None:
+        """
+        Initializes the UI.
+        :return:
+        """
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.title_input = QLineEdit(self)
+        self.title_input.setPlaceholderText("Search titles")
+        self.title_input.setClearButtonEnabled(True)
+        layout.addWidget(self.title_input, stretch=2)
+
+        self.location_input = QLineEdit(self)
+        self.location_input.setPlaceholderText("Location")
+        self.location_input.setClearButtonEnabled(True)
+        layout.addWidget(self.location_input, stretch=1)
+
+        # The minimum of each bound is shown as "Any" and leaves the bound out
+        layout.addWidget(QLabel("Price:", self))
+        self.min_price_input = self.create_price_input("Min")
+        layout.addWidget(self.min_price_input)
+        self.max_price_input = self.create_price_input("Max")
+        layout.addWidget(self.max_price_input)
+
+        layout.addWidget(QLabel("Date:", self))
+        self.date_from_input = self.create_date_input()
+        layout.addWidget(self.date_from_input)
+        self.date_to_input = self.create_date_input()
+        layout.addWidget(self.date_to_input)
+
+        clear_button = QPushButton("Clear", self)
+        clear_button.clicked.connect(self.clear)
+        layout.addWidget(clear_button)
+
+        self.count_label = QLabel(self)
+        layout.addWidget(self.count_label)
+        self.update_count_label()
+
+        self.title_input.textChanged.connect(self.schedule_filter)
+        self.location_input.textChanged.connect(self.schedule_filter)
+        self.min_price_input.valueChanged.connect(self.schedule_filter)
+        self.max_price_input.valueChanged.connect(self.schedule_filter)
+        self.date_from_input.dateChanged.connect(self.schedule_filter)
+        self.date_to_input.dateChanged.connect(self.schedule_filter)
+        self.model.rowsRemoved.connect(self.update_count_label)
+
+    def create_price_input(self, placeholder: str) -> QSpinBox:
+        """
+        Creates a price bound input.
+        :param placeholder: Text shown before "Any" when the bound is not set.
+        :return: Price input.
+        """
+        price_input = QSpinBox(self)
+        price_input.setRange(-1, self.max_price)
+        price_input.setSpecialValueText(f"{placeholder}: Any")
+        price_input.setValue(-1)
+        price_input.setSingleStep(100)
+        return price_input
+
+    def create_date_input(self) -> QDateEdit:
+        """
+        Creates a date bound input.
+        :return: Date input.
+        """
+        date_input = QDateEdit(self)
+        date_input.setCalendarPopup(True)
+        date_input.setDisplayFormat("yyyy-MM-dd")
+        date_input.setMinimumDate(QDate(2000, 1, 1))
+        date_input.setSpecialValueText("Any")
+        date_input.setDate(date_input.minimumDate())
+        return date_input
+
+    def criteria(self) -> ListingFilterCriteria:
+        """
+        Returns the filters currently set in the bar.
+        :return: Filter criteria.
+        """
+        def price(price_input: QSpinBox) -> Optional[int]:
+            return None if price_input.value() == price_input.minimum() else price_input.value()
+
+        def date(date_input: QDateEdit):
+            return None if date_input.date() == date_input.minimumDate() else date_input.date().toPyDate()
+
+        return ListingFilterCriteria(title=self.title_input.text(), location=self.location_input.text(),
+                                     min_price=price(self.min_price_input), max_price=price(self.max_price_input),
+                                     date_from=date(self.date_from_input), date_to=date(self.date_to_input))
+
+    def set_data_frame(self, df: pd.DataFrame) -> None:
+        """
+        Replaces the data frame displayed by the model and filters its rows with the filters set in the bar.
+        :param df: Data frame displayed by the model.
+        :return:
+        """
+        self.listing_filter = ListingFilter(df)
+        self.apply_filter()
+
+    def schedule_filter(self) -> None:
+        """
+        Filters the table once no filter was changed for filter_delay_ms.
+        :return:
+        """
+        self.filter_timer.start()
+
+    def apply_filter(self) -> None:
+        """
+        Filters the table with the filters set in the bar.
+        :return:
+        """
+        self.model.set_row_filter(self.listing_filter.mask(self.criteria()))
+        self.update_count_label()
+
+    def clear(self) -> None:
+        """
+        Clears all filters.
+        :return:
+        """
+        self.title_input.clear()
+        self.location_input.clear()
+        self.min_price_input.setValue(self.min_price_input.minimum())
+        self.max_price_input.setValue(self.max_price_input.minimum())
+        self.date_from_input.setDate(self.date_from_input.minimumDate())
+        self.date_to_input.setDate(self.date_to_input.minimumDate())
+
+    def update_count_label(self) -> None:
+        """
+        Updates the label with the number of listings shown.
+        :return:
+        """
+        self.count_label.setText(f"{self.model.total_row_count()} of {len(self.listing_filter.df.index)} listings")
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class ImageLoader(QObject):
+    """
+    Loads listing photos without blocking the GUI. Photos are downloaded and decoded in a thread pool, kept on disk
+    keyed by URL and kept decoded in memory, so a photo that was shown or prefetched before opens instantly.
+    Photos requested by the user have their own pool, so they are not queued behind prefetched ones.
+    """
+    image_loaded = pyqtSignal(str, QPixmap)  # Signal carrying the URL and the pixmap of a loaded photo
+    image_failed = pyqtSignal(str, str)  # Signal carrying the URL of a photo that could not be loaded and the error
+    # Emitted from the pool threads, the pending photos and the pixmaps are only handled in the GUI thread
+    _image_decoded = pyqtSignal(str, QImage)
+    _image_error = pyqtSignal(str, str)
+
+    def __init__(self, cache_dir: str, memory_cache_size: int = 100, max_size_mb: float = 200, workers: int = 2,
+                 prefetch_workers: int = 4, timeout: float = 10) -> None:
+        """
+        Initializes the ImageLoader and indexes the photos already stored in the cache directory.
+        :param cache_dir: Directory to store the downloaded photos in.
+        :param memory_cache_size: Number of decoded photos kept in memory, least recently used ones are dropped first.
+        :param max_size_mb: Maximum total size of the photos on disk in megabytes, least recently used ones are
+        evicted first.
+        :param workers: Number of threads loading the photos requested by the user.
+        :param prefetch_workers: Number of threads prefetching photos.
+        :param timeout: Timeout of a photo download in seconds.
+        """
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.memory_cache_size = memory_cache_size
+        self.max_size = max_size_mb * 1024 * 1024
+        self.timeout = timeout
+        self._pixmaps: OrderedDict[str, QPixmap] = OrderedDict()
+        self._pending: set[str] = set()
+        self._prefetches: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-loader')
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='image-prefetch')
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sizes = {entry.path: entry.stat().st_size for entry in os.scandir(self.cache_dir)
+                       if entry.name.endswith('.img')}
+        self._image_decoded.connect(self._store_image)
+        self._image_error.connect(self._report_error)
+
+    def cached(self, url: str) -> Optional[QPixmap]:
+        """
+        Returns the photo if it is decoded in memory and marks it as recently used.
+        :param url: URL of the photo.
+        :return: The photo, None if it is not in memory.
+        """
+        pixmap = self._pixmaps.get(url)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(url)
+        return pixmap
+
+    def load(self, url: str) -> None:
+        """
+        Loads a photo in the background, image_loaded or image_failed is emitted once it is done.
+        :param url: URL of the photo.
+        :return:
+        """
+        pixmap = self.cached(url)
+        if pixmap is not None:
+            self.image_loaded.emit(url, pixmap)
+            return
+        # A photo still queued for prefetching is moved to the pool of the requested photos
+        prefetch = self._prefetches.get(url)
+        if prefetch is not None and prefetch.cancel():
+            self._pending.discard(url)
+        if url not in self._pending:
+            self._pending.add(url)
+            self._executor.submit(self._load_image, url)
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        """
+        Loads photos in the background before they are requested. Photos already loaded or loading are skipped.
+        :param urls: URLs of the photos.
+        :return:
+        """
+        for url in urls:
+            if url and url not in self._pixmaps and url not in self._pending:
+                self._pending.add(url)
+                self._prefetches[url] = self._prefetch_executor.submit(self._load_image, url)
+
+    def shutdown(self) -> None:
+        """
+        Cancels the photos waiting to be loaded and stops the threads.
+        :return:
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_image(self, url: str) -> None:
+        """
+        Reads a photo from the disk cache or downloads it, and decodes it. Runs in the thread pool.
+        :param url: URL of the photo.
+        :return:
+        """
+        try:
+            data = self._read_cached(url)
+            if data is None:
+                import requests  # Loaded on first use, it is not needed at startup
+
+                response = requests.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.content
+                self._write_cached(url, data)
+            image = QImage()
+            if not image.loadFromData(data):
+                raise Exception("The downloaded file is not an image")
+            self._image_decoded.emit(url, image)
+        except Exception as e:
+            self._image_error.emit(url, str(e))
+
+    def _store_image(self, url: str, image: QImage) -> None:
+        """
+        Converts a decoded photo to a pixmap in the GUI thread, keeps it in memory and emits image_loaded.
+        :param url: URL of the photo.
+        :param image: The decoded photo.
+        :return:
+        """
+        pixmap = QPixmap.fromImage(image)
+        self._pending.discard(url)
+        self._prefetches.pop(url, None)
+        self._pixmaps[url] = pixmap
+        while len(self._pixmaps) > self.memory_cache_size:
+            self._pixmaps.popitem(last=False)
+        self.image_loaded.emit(url, pixmap)
+
+    def _report_error(self, url: str, message: str) -> None:
+        """
+        Emits image_failed in the GUI thread, a failed photo can be requested again.
+        :param url: URL of the photo.
+        :param message: Error message.
+        :return:
+        """
+        self._pending.discard(url)
+        self._prefetches.pop(url, None)
+        self.image_failed.emit(url, message)
+
+    def _entry_path(self, url: str) -> str:
+        """
+        Returns the path of the cache file for the given URL.
+        :param url: URL of the photo.
+        :return: Path of the cache file.
+        """
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.img")
+
+    def _read_cached(self, url: str) -> Optional[bytes]:
+        """
+        Returns the photo stored on disk and marks it as recently used.
+        :param url: URL of the photo.
+        :return: Content of the photo file, None if it is not cached.
+        """
+        path = self._entry_path(url)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)  # The modification time orders the entries for eviction
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _write_cached(self, url: str, data: bytes) -> None:
+        """
+        Stores a downloaded photo on disk, evicting the least recently used photos if the cache grows too large.
+        The file is written under a temporary name and renamed, so other threads never read a partial photo.
+        :param url: URL of the photo.
+        :param data: Content of the photo file.
+        :return:
+        """
+        path = self._entry_path(url)
+        temporary_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+        with self._lock:
+            self._sizes[path] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used photos until the cache fits in its maximum size. Called with the lock held.
+        :return:
+        """
+        total_size = sum(self._sizes.values())
+        if total_size <= self.max_size:
+            return
+        for path in sorted(self._sizes, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0):
+            total_size -= self._sizes.pop(path)
+            if os.path.exists(path):
+                os.remove(path)
+            if total_size <= self.max_size:
+                break
@@ -0,0 +1,140 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.Exporting.formatting import parse_date
+
+
+@dataclass
+class ListingFilterCriteria:
+    """Dataclass holding the filters of a listings table, None or empty strings leave a filter out."""
+    title: str = ""
+    location: str = ""
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    date_from: Optional[datetime.date] = None
+    date_to: Optional[datetime.date] = None
+
+
+def fold_text(values: pd.Series) -> np.ndarray:
+    """
+    Returns the strings lowercased and without diacritics, so that "Wroclaw" matches "Wrocław".
+    :param values: The strings to fold
+    :return: Array with the folded strings
+    """
+    return (values.astype(str).str.lower().str.replace('ł', 'l', regex=False).str.normalize('NFKD')
+            .str.encode('ascii', errors='ignore').str.decode('ascii').to_numpy())
+
+
+class ListingFilter:
+    """
+    Filters the listings of a data frame with vectorized comparisons. The folded titles, the prices, the locations
+    and the dates are indexed once, the first time they are filtered by, and the data frame is never copied.
+    """
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        Initializes the ListingFilter.
+        :param df: The data frame with the listings
+        """
+        self.df = df
+        self._titles: Optional[pd.Series] = None
+        self._prices: Optional[np.ndarray] = None
+        self._location_codes: Optional[np.ndarray] = None
+        self._locations: Optional[np.ndarray] = None
+        self._dates: Optional[np.ndarray] = None
+        # Last title search and its matches, a longer query only has to be searched for among these
+        self._last_title_search: Optional[tuple[str, np.ndarray]] = None
+
+    def mask(self, criteria: ListingFilterCriteria) -> Optional[np.ndarray]:
+        """
+        Returns which listings match the criteria.
+        :param criteria: The filters to apply
+        :return: Boolean array with True for the matching listings, None if no filter is set
+        """
+        mask = None
+        if criteria.title.strip() and 'Title' in self.df.columns:
+            mask = self._match_titles(fold_text(pd.Series([criteria.title.strip()]))[0])
+        if criteria.location.strip() and 'Location' in self.df.columns:
+            mask = self._combine(mask, self._match_locations(fold_text(pd.Series([criteria.location.strip()]))[0]))
+        if (criteria.min_price is not None or criteria.max_price is not None) and 'Price' in self.df.columns:
+            prices = self._get_prices()
+            with np.errstate(invalid='ignore'):
+                if criteria.min_price is not None:
+                    mask = self._combine(mask, prices >= criteria.min_price)
+                if criteria.max_price is not None:
+                    mask = self._combine(mask, prices <= criteria.max_price)
+        if (criteria.date_from is not None or criteria.date_to is not None) and 'Date' in self.df.columns:
+            dates = self._get_dates()
+            with np.errstate(invalid='ignore'):
+                if criteria.date_from is not None:
+                    mask = self._combine(mask, dates >= criteria.date_from.toordinal())
+                if criteria.date_to is not None:
+                    mask = self._combine(mask, dates <= criteria.date_to.toordinal())
+        return mask
+
+    @staticmethod
+    def _combine(mask: Optional[np.ndarray], other: np.ndarray) -> np.ndarray:
+        """
+        Returns the intersection of two masks.
+        :param mask: The mask of the filters applied so far, None if there are none
+        :param other: The mask of the next filter
+        :return: The combined mask
+        """
+        return other if mask is None else mask & other
+
+    def _match_titles(self, query: str) -> np.ndarray:
+        """
+        Returns which folded titles contain the folded query. If the query extends the previous one, like while it is
+        being typed, only the titles that matched the previous query are searched.
+        :param query: The folded query
+        :return: Boolean array with True for the matching titles
+        """
+        if self._titles is None:
+            self._titles = pd.Series(fold_text(self.df['Title']))
+        if self._last_title_search is not None and self._last_title_search[0] in query:
+            candidates = np.flatnonzero(self._last_title_search[1])
+        else:
+            candidates = np.arange(len(self._titles))
+        matches = np.zeros(len(self._titles), dtype=bool)
+        matches[candidates] = self._titles.iloc[candidates].str.contains(query, regex=False).to_numpy(dtype=bool)
+        self._last_title_search = query, matches
+        return matches
+
+    def _match_locations(self, query: str) -> np.ndarray:
+        """
+        Returns which folded locations contain the folded query. Listings share few locations, so only the unique
+        locations are searched.
+        :param query: The folded query
+        :return: Boolean array with True for the matching locations
+        """
+        if self._location_codes is None:
+            self._location_codes, locations = pd.factorize(self.df['Location'])
+            self._locations = fold_text(pd.Series(locations))
+        # Missing locations have the code -1 and never match
+        matches = np.append([query in location for location in self._locations], False)
+        return matches[self._location_codes]
+
+    def _get_prices(self) -> np.ndarray:
+        """
+        Returns the prices as floats, NaN where a price is missing.
+        :return: Array with the price of each listing
+        """
+        if self._prices is None:
+            self._prices = pd.to_numeric(self.df['Price'], errors='coerce').to_numpy(dtype=np.float64)
+        return self._prices
+
+    def _get_dates(self) -> np.ndarray:
+        """
+        Returns the dates as proleptic Gregorian ordinals, NaN where a date can't be parsed. Listings share few dates,
+        so only the unique dates are parsed.
+        :return: Array with the date of each listing
+        """
+        if self._dates is None:
+            codes, dates = pd.factorize(self.df['Date'])
+            ordinals = [parse_date(str(date)) for date in dates]
+            ordinals = np.array([date.toordinal() if date else np.nan for date in ordinals] + [np.nan])
+            self._dates = ordinals[codes]
+        return self._dates
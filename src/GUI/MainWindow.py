@@ -1,16 +1,21 @@
 import sys
+from typing import Optional
+
+import pandas as pd
 from PyQt5.QtWidgets import QMainWindow, QAction, qApp, QPushButton, QVBoxLayout, QWidget, QStackedLayout, QHBoxLayout, \
-    QLabel, QDialog, QTableView, QProgressBar, QMenu, QToolButton, QMessageBox, QLayout
+    QLabel, QDialog, QTableView, QProgressBar, QMenu, QToolButton, QMessageBox, QLayout, QHeaderView
 from PyQt5.QtGui import QFont, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QPoint, QModelIndex, QProcess, QTimer
 from src.GUI.DataFrameModel import DataFrameModel
 from src.GUI.Controller import Controller
 from src.GUI.ClickableDelegate import ClickableDelegate
 from src.GUI.ExportDialog import ExportDialog
+from src.GUI.FilterBar import FilterBar
 from src.GUI.ImageDialog import ImageDialog
+from src.GUI.ImageLoader import ImageLoader
 from src.GUI.SettingsDialog import SettingsDialog
 from src.GUI.ScrapingHistoryDialog import ScrapingHistoryDialog
-import requests
+from src.Scraping.ScrapeProgress import ScrapeProgress
 
 
 def reboot_application() -> None:
@@ -24,6 +29,11 @@ def reboot_application() -> None:
 
 class MainWindow(QMainWindow):
     """Main window of the application."""
+    # Number of rows the column widths of the tables are computed from
+    column_sizing_sample_rows = 200
+    # Delay after the table was scrolled before the photos of the visible rows are prefetched
+    prefetch_delay_ms = 200
+
     def __init__(self, title: str, width: int, height: int, controller: Controller) -> None:
         """
         Initializes the main window.
@@ -35,10 +45,27 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.controller = controller
         self.controller.progress_updated.connect(self.update_progress_bar)
+        self.controller.batch_scraped.connect(self.show_batch)
         self.controller.scraping_done.connect(self.update_last_scrape_label)
         self.controller.scraping_done.connect(self.enable_buttons)
         self.controller.scraping_failed.connect(self.show_scraping_error)
+        self.controller.scraping_done.connect(self.finish_scraping)
+        self.controller.scraping_failed.connect(self.finish_scraping)
+        self.controller.scraping_cancelled.connect(self.finish_scraping)
         self.settings_dialog = SettingsDialog(config_path='Resources/config.json')
+        self.image_loader = ImageLoader(cache_dir='Resources/image_cache')
+        self.image_loader.image_loaded.connect(self.show_loaded_image)
+        self.image_loader.image_failed.connect(self.show_image_error)
+        qApp.aboutToQuit.connect(self.image_loader.shutdown)
+        self.requested_image_url: Optional[str] = None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(self.prefetch_delay_ms)
+        self.prefetch_timer.timeout.connect(self.prefetch_images)
+        # Models and filter bars of the shown tables by data key, and the listings streamed in by the running scrape
+        self.table_models: dict[str, DataFrameModel] = {}
+        self.filter_bars: dict[str, FilterBar] = {}
+        self.streamed_data: dict[str, pd.DataFrame] = {}
         self.init_ui(title, width, height)
 
     def init_ui(self, title: str, width: int, height: int) -> None:
@@ -68,6 +95,7 @@ class MainWindow(QMainWindow):
         self.button_layout.addWidget(self.menu_button)
 
         self.stacked_layout = QStackedLayout()
+        self.stacked_layout.currentChanged.connect(self.schedule_prefetch)
         main_layout.addLayout(self.stacked_layout)
 
         self.setup_progress_bar(main_layout)
@@ -126,10 +154,11 @@ class MainWindow(QMainWindow):
         self.scrape_button = self.create_button('Scrape Data', self.start_scraping)
         self.button_layout.addWidget(self.scrape_button)
 
-        self.view_button = self.create_button('View Data', lambda: self.show_data(), enabled=False)
+        has_stored_data = bool(self.controller.scraper.data_frames)
+        self.view_button = self.create_button('View Data', lambda: self.show_data(), enabled=has_stored_data)
         self.button_layout.addWidget(self.view_button)
 
-        self.export_button = self.create_button('Export Data', self.show_export_dialog, enabled=False)
+        self.export_button = self.create_button('Export Data', self.show_export_dialog, enabled=has_stored_data)
         self.button_layout.addWidget(self.export_button)
 
         self.view_search_queries_button = self.create_button('View Search Queries', self.controller.view_search_queries)
@@ -164,6 +193,11 @@ class MainWindow(QMainWindow):
         self.progress_layout = QHBoxLayout()
         self.progress_layout.addWidget(self.last_scrape_label)
         self.progress_layout.addWidget(self.progress_bar)
+        self.cancel_button = QPushButton('Cancel', self)
+        self.cancel_button.setToolTip('Cancel scraping')
+        self.cancel_button.clicked.connect(self.controller.cancel_scraping)
+        self.cancel_button.setVisible(False)
+        self.progress_layout.addWidget(self.cancel_button)
         layout.addLayout(self.progress_layout)
 
     def create_menu_button(self) -> QToolButton:
@@ -178,8 +212,7 @@ class MainWindow(QMainWindow):
         menu = QMenu(menu_button)
 
         self.scrape_action = QAction('Scrape Data', self)
-        self.scrape_action.triggered.connect(self.show_progress_bar)
-        self.scrape_action.triggered.connect(self.controller.scrape_data)
+        self.scrape_action.triggered.connect(self.start_scraping)
         menu.addAction(self.scrape_action)
 
         self.view_action = QAction('View Data', self)
@@ -209,13 +242,14 @@ class MainWindow(QMainWindow):
         """
         self.progress_bar.setVisible(True)
 
-    def update_progress_bar(self, value: float) -> None:
+    def update_progress_bar(self, progress: ScrapeProgress) -> None:
         """
-        Updates the progress bar.
-        :param value: Value to set the progress bar to.
+        Updates the progress bar with the pages fetched and the throughput of the scrape.
+        :param progress: Progress of the scrape.
         :return:
         """
-        self.progress_bar.setValue(value)
+        self.progress_bar.setValue(progress.percent)
+        self.progress_bar.setFormat(progress.summary() if progress.pages_fetched else '%p%')
 
     def show_export_dialog(self) -> None:
         """
@@ -252,6 +286,8 @@ class MainWindow(QMainWindow):
             widget = self.stacked_layout.widget(0)
             self.stacked_layout.removeWidget(widget)
             widget.deleteLater()
+        self.table_models.clear()
+        self.filter_bars.clear()
 
         # Add new table views with titles
         for title, df in self.controller.scraper.data_frames.items():
@@ -268,20 +304,33 @@ class MainWindow(QMainWindow):
             table_view = QTableView()
             table_view.setSortingEnabled(True)  # Enable sorting
             model = DataFrameModel(df)
+            model.row_removed.connect(lambda label, key=title: self.controller.remove_listing(key, label))
             table_view.setModel(model)
             click_delegate = ClickableDelegate()
             table_view.setItemDelegateForColumn(4, click_delegate)
             table_view.setItemDelegateForColumn(5, click_delegate)
+            # Size the columns from a sample of the rows and give every row the height of one line, measuring every
+            # row of large tables would block the window
+            table_view.horizontalHeader().setResizeContentsPrecision(self.column_sizing_sample_rows)
             table_view.resizeColumnsToContents()
-            table_view.resizeRowsToContents()
+            table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
             table_view.setShowGrid(True)
             table_view.setEditTriggers(QTableView.NoEditTriggers)
 
+            # Prefetch the photos of the rows scrolled, sorted or filtered into view
+            table_view.verticalScrollBar().valueChanged.connect(self.schedule_prefetch)
+            model.layoutChanged.connect(self.schedule_prefetch)
+            model.modelReset.connect(self.schedule_prefetch)
+
             # Set up the context menu
             table_view.setContextMenuPolicy(Qt.CustomContextMenu)
             table_view.customContextMenuRequested.connect(self.show_context_menu)
 
+            filter_bar = FilterBar(df, model)
+            container_layout.addWidget(filter_bar)
+            self.table_models[title] = model
+            self.filter_bars[title] = filter_bar
             container_layout.addWidget(table_view)
 
             self.stacked_layout.addWidget(container_widget)
@@ -306,11 +355,54 @@ class MainWindow(QMainWindow):
 
     def start_scraping(self) -> None:
         """
-        Starts the scraping process, showing the progress bar before beginning.
+        Starts the scraping process in the background, showing the progress bar and the cancel button.
         :return:
         """
         self.show_progress_bar()
-        QTimer.singleShot(0, self.controller.scrape_data)
+        self.cancel_button.setVisible(True)
+        self.scrape_button.setEnabled(False)
+        self.scrape_action.setEnabled(False)
+        self.streamed_data.clear()
+        self.controller.scrape_data()
+
+    def finish_scraping(self) -> None:
+        """
+        Restores the controls after the scraping process finished, failed or was cancelled.
+        :return:
+        """
+        self.cancel_button.setVisible(False)
+        self.scrape_button.setEnabled(True)
+        self.scrape_action.setEnabled(True)
+        # Failed and cancelled queries keep their previous data, the tables show the data kept by the scraper
+        for key in self.streamed_data:
+            self.show_table_data(key, self.controller.scraper.data_frames.get(key, pd.DataFrame()))
+        self.streamed_data.clear()
+
+    def show_batch(self, key: str, batch: pd.DataFrame) -> None:
+        """
+        Appends a page of scraped listings to the shown table of its query. The first page of a scrape replaces the
+        listings of the previous scrape.
+        :param key: Data key of the query.
+        :param batch: Data frame with the listings of the page.
+        :return:
+        """
+        if key not in self.table_models:
+            return
+        if key in self.streamed_data:
+            batch = pd.concat([self.streamed_data[key], batch], ignore_index=True)
+        self.streamed_data[key] = batch
+        self.show_table_data(key, batch)
+
+    def show_table_data(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Replaces the data frame shown in the table of a query, keeping its sorting and its filters.
+        :param key: Data key of the query.
+        :param df: Data frame to show.
+        :return:
+        """
+        if key in self.table_models:
+            self.table_models[key].update_data_frame(df)
+            self.filter_bars[key].set_data_frame(df)
 
     def show_next(self) -> None:
         """
@@ -362,6 +454,8 @@ class MainWindow(QMainWindow):
             context_menu.addAction(show_image_action)
 
             delete_row_action = QAction('Delete Item', self)
+            # Rows of a table being streamed in are replaced once the scrape finishes
+            delete_row_action.setEnabled(not self.controller.is_scraping())
             delete_row_action.triggered.connect(lambda: self.delete_row(indexes[0]))
             context_menu.addAction(delete_row_action)
 
@@ -377,7 +471,8 @@ class MainWindow(QMainWindow):
 
     def show_image(self, index: QModelIndex) -> None:
         """
-        Shows the image in a dialog.
+        Shows the image in a dialog. Images that were shown or prefetched before are shown instantly, others are
+        loaded in the background and shown by show_loaded_image.
         :param index: Index of the selected row.
         :return:
         """
@@ -388,20 +483,63 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "No Image", "No image URL found in the selected row.")
             return
 
-        # Fetches and displays the image
-        try:
-            response = requests.get(image_url)
-            response.raise_for_status()
-            image_data = response.content
+        pixmap = self.image_loader.cached(image_url)
+        if pixmap is not None:
+            ImageDialog(self, pixmap).exec_()
+            return
+
+        self.requested_image_url = image_url
+        self.statusBar().showMessage("Loading image...")
+        self.image_loader.load(image_url)
 
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
+    def show_loaded_image(self, image_url: str, pixmap: QPixmap) -> None:
+        """
+        Shows a loaded image in a dialog if it is the image requested last. Prefetched images are only cached.
+        :param image_url: URL of the image.
+        :param pixmap: The image.
+        :return:
+        """
+        if image_url != self.requested_image_url:
+            return
+        self.requested_image_url = None
+        self.statusBar().clearMessage()
+        ImageDialog(self, pixmap).exec_()
 
-            image_dialog = ImageDialog(self, pixmap)
-            image_dialog.exec_()
+    def show_image_error(self, image_url: str, message: str) -> None:
+        """
+        Shows a message box if the image requested last could not be loaded. Failed prefetches are ignored.
+        :param image_url: URL of the image.
+        :param message: Error message.
+        :return:
+        """
+        if image_url != self.requested_image_url:
+            return
+        self.requested_image_url = None
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Could not load image: {message}")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not load image: {e}")
+    def schedule_prefetch(self) -> None:
+        """
+        Prefetches the images of the visible rows once the table stopped scrolling for prefetch_delay_ms.
+        :return:
+        """
+        self.prefetch_timer.start()
+
+    def prefetch_images(self) -> None:
+        """
+        Prefetches the images of the rows visible in the current table.
+        :return:
+        """
+        container_widget = self.stacked_layout.currentWidget()
+        table_view = container_widget.findChild(QTableView) if container_widget else None
+        if table_view is None or table_view.model() is None:
+            return
+        model = table_view.model()
+        first_row = max(table_view.rowAt(0), 0)
+        last_row = table_view.rowAt(table_view.viewport().height() - 1)
+        if last_row < 0:
+            last_row = model.rowCount() - 1
+        self.image_loader.prefetch(model.index(row, 5).data() for row in range(first_row, last_row + 1))
 
     def enable_buttons(self):
         """
@@ -436,6 +574,7 @@ class MainWindow(QMainWindow):
             self.prev_button.setStyleSheet(button_style)
             self.next_button.setStyleSheet(button_style)
             self.menu_button.setStyleSheet(button_style)
+            self.cancel_button.setStyleSheet(button_style)
 
     def apply_dark_mode(self) -> None:
         """
@@ -0,0 +1,135 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urljoin
+
+from src.Exporting.formatting import format_price, format_location_date
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, the BeautifulSoup parser is used without it
+    lxml = None
+
+if TYPE_CHECKING:
+    import bs4.element
+
+
+@dataclass
+class ParsedPage:
+    """Dataclass holding the listings extracted from a single OLX search page."""
+    listings: list[dict]
+    count_text: Optional[str] = None
+
+
+class ListingParser(ABC):
+    """Base class for extracting listing cards and the total listing count from OLX search pages."""
+    name: str = ""
+
+    @abstractmethod
+    def parse(self, html: str) -> ParsedPage:
+        """
+        Parses the HTML of an OLX search page.
+        :param html: HTML content of the page.
+        :return: Parsed page with the processed listings and the raw text of the total count element.
+        """
+
+
+class BeautifulSoupListingParser(ListingParser):
+    """Pure-Python parser based on BeautifulSoup's html.parser. Used as a fallback when lxml is unavailable."""
+    name = "html.parser"
+
+    def parse(self, html: str) -> ParsedPage:
+        """
+        Parses the HTML of an OLX search page with BeautifulSoup.
+        :param html: HTML content of the page.
+        :return: Parsed page with the processed listings and the raw text of the total count element.
+        """
+        from bs4 import BeautifulSoup  # Only loaded when the fallback parser is actually used
+
+        soup = BeautifulSoup(html, "html.parser")
+        listings = [self._process_item(item) for item in soup.find_all("div", {"data-cy": "l-card"})]
+        count_element = soup.find("span", {"data-testid": "total-count"})
+        return ParsedPage(listings, count_element.text if count_element else None)
+
+    @staticmethod
+    def _process_item(item: "bs4.element.Tag") -> dict:
+        """
+        Processes an item from the scraped data.
+        :param item: Item to process.
+        :return: Dictionary with the processed item data.
+        """
+        title = item.find("h6").text.strip()
+        price = format_price(item.find("p").text)
+        location_date = item.find("p", {"data-testid": "location-date"})
+        location, date = format_location_date(location_date.text) if location_date else ("", "")
+        image = item.find("img")
+        photo = image.get("src") if image else ""
+        item_url = urljoin("https://www.olx.pl", item.find("a").get("href"))
+
+        return {"Title": title, "Price": price, "Location": location, "Date": date, "Item URL": item_url,
+                "Photo": photo}
+
+
+class LxmlListingParser(ListingParser):
+    """Parser based on lxml that only visits the listing cards and the total count element."""
+    name = "lxml"
+
+    def parse(self, html: str) -> ParsedPage:
+        """
+        Parses the HTML of an OLX search page with lxml.
+        :param html: HTML content of the page.
+        :return: Parsed page with the processed listings and the raw text of the total count element.
+        """
+        tree = lxml.html.document_fromstring(html)
+        listings = [self._process_item(item) for item in tree.iterfind('.//div[@data-cy="l-card"]')]
+        count_element = tree.find('.//span[@data-testid="total-count"]')
+        return ParsedPage(listings, count_element.text_content() if count_element is not None else None)
+
+    @staticmethod
+    def _process_item(item: "lxml.html.HtmlElement") -> dict:
+        """
+        Processes an item from the scraped data.
+        :param item: Item to process.
+        :return: Dictionary with the processed item data.
+        """
+        title = item.find(".//h6").text_content().strip()
+        price = format_price(item.find(".//p").text_content())
+        location_date = item.find('.//p[@data-testid="location-date"]')
+        location, date = format_location_date(location_date.text_content()) if location_date is not None else ("", "")
+        image = item.find(".//img")
+        photo = image.get("src") if image is not None else ""
+        item_url = urljoin("https://www.olx.pl", item.find(".//a").get("href"))
+
+        return {"Title": title, "Price": price, "Location": location, "Date": date, "Item URL": item_url,
+                "Photo": photo}
+
+
+PARSERS: dict[str, type[ListingParser]] = {
+    BeautifulSoupListingParser.name: BeautifulSoupListingParser,
+    LxmlListingParser.name: LxmlListingParser,
+}
+
+
+def get_listing_parser(name: str = LxmlListingParser.name) -> ListingParser:
+    """
+    Returns the listing parser registered under the given name.
+    Falls back to the BeautifulSoup parser if lxml is requested but not installed.
+    :param name: Name of the parser backend.
+    :return: Listing parser instance.
+    """
+    if name not in PARSERS:
+        raise ValueError(f"Unsupported parser: {name}")
+    if name == LxmlListingParser.name and lxml is None:
+        name = BeautifulSoupListingParser.name
+    return PARSERS[name]()
+
+
+def parse_page(html: str, parser_name: str) -> ParsedPage:
+    """
+    Parses an OLX search page with the given parser backend.
+    Defined at module level so it can be sent to worker processes.
+    :param html: HTML content of the page.
+    :param parser_name: Name of the parser backend.
+    :return: Parsed page with plain dictionary rows.
+    """
+    return get_listing_parser(parser_name).parse(html)
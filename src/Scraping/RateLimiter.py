@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Adaptive token bucket shared by all requests of the Scraper. The rate is increased additively after successful
+    requests and halved when the server throttles or fails, so it settles just below the highest rate OLX tolerates.
+    """
+    def __init__(self, requests_per_second: float, burst: int = 1, min_requests_per_second: float = 0.2,
+                 max_requests_per_second: Optional[float] = None, increase_step: float = 0.1) -> None:
+        """
+        Initializes the RateLimiter.
+        :param requests_per_second: Initial request rate.
+        :param burst: Number of requests that can be sent at once before the rate applies.
+        :param min_requests_per_second: Lowest rate the limiter can slow down to.
+        :param max_requests_per_second: Highest rate the limiter can speed up to, the initial rate if None.
+        :param increase_step: Rate increase after each successful request.
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        self.min_requests_per_second = min_requests_per_second
+        self.max_requests_per_second = max_requests_per_second or requests_per_second
+        self.increase_step = increase_step
+        self._theoretical_arrival = 0.0
+        self._blocked_until = 0.0
+        # Created per event loop, like the Scraper's session
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._changed: Optional[asyncio.Event] = None
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request can be sent without exceeding the current rate.
+        Callers queue in order on a lock, and the first one re-checks the current rate and the time the server asked
+        to wait for after every sleep and whenever the rate changes, so the requests already waiting slow down after
+        a throttled request and speed up after successful ones.
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._changed = asyncio.Event()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                interval = 1 / self.requests_per_second
+                ready_at = max(self._theoretical_arrival - (self.burst - 1) * interval, self._blocked_until)
+                if ready_at <= now:
+                    break
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), ready_at - now)
+                except asyncio.TimeoutError:
+                    pass
+            self._theoretical_arrival = max(self._theoretical_arrival, now) + interval
+
+    def _notify(self) -> None:
+        """
+        Wakes the request waiting for its turn, so it re-checks the rate.
+        :return:
+        """
+        if self._changed is not None:
+            self._changed.set()
+
+    def on_success(self) -> None:
+        """
+        Speeds the limiter up after a successful request.
+        :return:
+        """
+        requests_per_second = min(self.max_requests_per_second, self.requests_per_second + self.increase_step)
+        if requests_per_second != self.requests_per_second:
+            self.requests_per_second = requests_per_second
+            self._notify()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """
+        Slows the limiter down after the server throttled or failed a request.
+        :param retry_after: Time in seconds the server asked to wait before the next request.
+        :return:
+        """
+        self.requests_per_second = max(self.min_requests_per_second, self.requests_per_second / 2)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self._notify()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+from typing import Optional, TYPE_CHECKING
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:  # aiohttp.web is only needed by the ReplayServer, not by the Scraper recording responses
+    from aiohttp import web
+
+
+def fixture_key(url: str) -> str:
+    """
+    Returns the key of a recorded response, made of the path and query of its URL so that it does not depend on the host.
+    :param url: URL of the page.
+    :return: Key of the fixture.
+    """
+    parsed_url = urlparse(url)
+    return f"{parsed_url.path}?{parsed_url.query}" if parsed_url.query else parsed_url.path
+
+
+class FixtureRecorder:
+    """Class for recording raw responses of OLX search pages into a fixtures directory."""
+    def __init__(self, fixtures_dir: str) -> None:
+        """
+        Initializes the FixtureRecorder.
+        :param fixtures_dir: Directory to store the recorded responses in.
+        """
+        self.fixtures_dir = fixtures_dir
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        self.index_path = os.path.join(self.fixtures_dir, 'index.json')
+        self.index = load_fixture_index(self.fixtures_dir)
+
+    def record(self, url: str, html: str) -> None:
+        """
+        Records the response of a page and adds it to the fixtures index.
+        :param url: URL of the page.
+        :param html: HTML content of the page.
+        :return:
+        """
+        key = fixture_key(url)
+        filename = f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.html"
+        with open(os.path.join(self.fixtures_dir, filename), 'w', encoding='utf-8') as file:
+            file.write(html)
+        self.index[key] = filename
+        with open(self.index_path, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file, ensure_ascii=False, indent=4)
+
+
+def load_fixture_index(fixtures_dir: str) -> dict[str, str]:
+    """
+    Loads the index mapping the recorded URLs to their fixture files.
+    :param fixtures_dir: Directory with the recorded responses.
+    :return: Dictionary of fixture filenames keyed by fixture key.
+    """
+    try:
+        with open(os.path.join(fixtures_dir, 'index.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class ReplayServer:
+    """Local HTTP server serving recorded OLX responses, used as a stand-in for olx.pl without network access."""
+    def __init__(self, fixtures_dir: str, host: str = '127.0.0.1', port: int = 0) -> None:
+        """
+        Initializes the ReplayServer.
+        :param fixtures_dir: Directory with the recorded responses.
+        :param host: Host to listen on.
+        :param port: Port to listen on, 0 picks a free port.
+        """
+        self.fixtures_dir = fixtures_dir
+        self.host = host
+        self.port = port
+        self.index = load_fixture_index(fixtures_dir)
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._runner: Optional["web.AppRunner"] = None
+
+    async def start(self) -> str:
+        """
+        Starts the server.
+        :return: Base URL of the server, to be passed to the Scraper as its base_url.
+        """
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return f"http://{self.host}:{self.port}"
+
+    async def stop(self) -> None:
+        """
+        Stops the server.
+        :return:
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: "web.Request") -> "web.Response":
+        """
+        Serves the recorded response for the requested URL.
+        :param request: Incoming request.
+        :return: Recorded response, 404 if the URL was not recorded.
+        """
+        from aiohttp import web
+
+        filename = self.index.get(fixture_key(str(request.rel_url)))
+        if filename is None:
+            return web.Response(status=404)
+        with open(os.path.join(self.fixtures_dir, filename), 'rb') as file:
+            body = file.read()
+        self.requests_served += 1
+        self.bytes_served += len(body)
+        return web.Response(body=body, content_type='text/html', charset='utf-8')
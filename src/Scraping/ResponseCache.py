@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+
+class ResponseCache:
+    """On-disk cache of fetched pages keyed by URL, with TTL-based freshness and size-bounded LRU eviction."""
+    def __init__(self, cache_dir: str, ttl: float = 600, max_size_mb: float = 100, offline: bool = False) -> None:
+        """
+        Initializes the ResponseCache and indexes the entries already stored in the cache directory.
+        :param cache_dir: Directory to store the cached responses in.
+        :param ttl: Time in seconds for which a cached response is used without contacting the server.
+        :param max_size_mb: Maximum total size of the cache in megabytes, least recently used entries are evicted first.
+        :param offline: If True, every cached response is treated as fresh, so runs can be replayed without network.
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_size = max_size_mb * 1024 * 1024
+        self.offline = offline
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sizes = {entry.path: entry.stat().st_size for entry in os.scandir(self.cache_dir)
+                       if entry.name.endswith('.json')}
+
+    def _entry_path(self, url: str) -> str:
+        """
+        Returns the path of the cache file for the given URL.
+        :param url: URL of the page.
+        :return: Path of the cache file.
+        """
+        return os.path.join(self.cache_dir, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the cached entry for the given URL and marks it as recently used.
+        :param url: URL of the page.
+        :return: Cached entry, None if the URL is not cached.
+        """
+        path = self._entry_path(url)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)  # The modification time orders the entries for eviction
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        """
+        Checks if a cached entry can be used without revalidating it with the server.
+        :param entry: Cached entry.
+        :return: True if the entry is fresh.
+        """
+        return self.offline or time.time() - entry['fetched_at'] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> dict[str, str]:
+        """
+        Returns the headers asking the server to respond with 304 Not Modified if the cached page is still valid.
+        :param entry: Cached entry, None if the URL is not cached.
+        :return: Dictionary of request headers.
+        """
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url: str, html: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+            parsed: Optional[dict] = None) -> dict:
+        """
+        Stores a fetched page in the cache, evicting the least recently used entries if the cache grows too large.
+        :param url: URL of the page.
+        :param html: HTML content of the page.
+        :param etag: Value of the ETag response header.
+        :param last_modified: Value of the Last-Modified response header.
+        :param parsed: Parsed content of the page, stored so cache hits do not need to be parsed again.
+        :return: Stored entry.
+        """
+        entry = {'url': url, 'fetched_at': time.time(), 'etag': etag, 'last_modified': last_modified, 'html': html,
+                 'parsed': parsed}
+        self._write(url, entry)
+        return entry
+
+    def refresh(self, url: str, entry: dict) -> None:
+        """
+        Marks a cached entry as fresh again after the server confirmed it was not modified.
+        :param url: URL of the page.
+        :param entry: Cached entry.
+        :return:
+        """
+        entry['fetched_at'] = time.time()
+        self._write(url, entry)
+
+    def _write(self, url: str, entry: dict) -> None:
+        """
+        Writes an entry to the cache directory.
+        :param url: URL of the page.
+        :param entry: Entry to write.
+        :return:
+        """
+        path = self._entry_path(url)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file, ensure_ascii=False)
+        self._sizes[path] = os.path.getsize(path)
+        self._evict()
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache fits in its maximum size.
+        :return:
+        """
+        total_size = sum(self._sizes.values())
+        if total_size <= self.max_size:
+            return
+        for path in sorted(self._sizes, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0):
+            total_size -= self._sizes.pop(path)
+            if os.path.exists(path):
+                os.remove(path)
+            if total_size <= self.max_size:
+                break
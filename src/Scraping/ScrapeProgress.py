@@ -0,0 +1,89 @@
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional, TextIO
+
+
+@dataclass
+class ScrapeProgress:
+    """Dataclass describing the progress and throughput of a running scrape."""
+    pages_fetched: int = 0
+    pages_expected: int = 0
+    requests: int = 0
+    bytes_downloaded: int = 0
+    listings: int = 0
+    pages_parsed: int = 0
+    parse_seconds: float = 0.0
+    finished: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        """Time in seconds since the scrape started."""
+        return self.updated_at - self.started_at
+
+    @property
+    def percent(self) -> int:
+        """Percentage of the expected pages that were fetched."""
+        if self.finished:
+            return 100
+        return min(99, int(self.pages_fetched / self.pages_expected * 100)) if self.pages_expected else 0
+
+    @property
+    def requests_per_second(self) -> float:
+        """Number of HTTP requests sent per second."""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Number of bytes downloaded per second."""
+        return self.bytes_downloaded / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def parse_ms_per_page(self) -> float:
+        """Average time in milliseconds of parsing a page."""
+        return self.parse_seconds * 1000 / self.pages_parsed if self.pages_parsed else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated time in seconds until the scrape finishes, None until the first page is fetched."""
+        if self.finished:
+            return 0.0
+        if not self.pages_fetched:
+            return None
+        return self.elapsed / self.pages_fetched * max(0, self.pages_expected - self.pages_fetched)
+
+    def summary(self) -> str:
+        """
+        Returns a one-line description of the progress.
+        :return: Progress summary.
+        """
+        eta = f"{self.eta:.0f} s" if self.eta is not None else "?"
+        return (f"{self.percent}% - {self.pages_fetched}/{self.pages_expected} pages, {self.listings} listings, "
+                f"{self.requests_per_second:.1f} req/s, {self.bytes_per_second / 1024:.0f} KiB/s, "
+                f"parse {self.parse_ms_per_page:.1f} ms/page, ETA {eta}")
+
+
+class ProgressLogger:
+    """Progress callback printing the progress of a scrape at most once per interval, for headless runs."""
+    def __init__(self, interval: float = 1.0, stream: TextIO = sys.stderr) -> None:
+        """
+        Initializes the ProgressLogger.
+        :param interval: Minimal time in seconds between two printed lines.
+        :param stream: Stream to print the progress to.
+        """
+        self.interval = interval
+        self.stream = stream
+        self._last_logged = 0.0
+
+    def __call__(self, progress: ScrapeProgress) -> None:
+        """
+        Prints the progress if the interval passed since the last printed line or the scrape finished.
+        :param progress: Progress of the scrape.
+        :return:
+        """
+        now = time.monotonic()
+        if progress.finished or now - self._last_logged >= self.interval:
+            self._last_logged = now
+            print(progress.summary(), file=self.stream)
@@ -1,35 +1,103 @@
 import json
 import os
-from datetime import datetime
-from typing import Union, Callable
-from urllib.parse import urlparse, urljoin
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Union, Callable, Optional, Mapping, AsyncIterator, AsyncGenerator
+from urllib.parse import urlparse
 
-import bs4.element
-from bs4 import BeautifulSoup
 import pandas as pd
 import aiohttp
 import asyncio
+import math
+import random
 import re
+import time
 
-from src.Exporting.formatting import format_price, format_location_date
+from src.Scraping.ListingParser import ParsedPage, get_listing_parser, parse_page
+from src.Scraping.RateLimiter import RateLimiter
+from src.Scraping.Replay import FixtureRecorder
+from src.Scraping.ScrapeProgress import ScrapeProgress
+from src.Scraping.ResponseCache import ResponseCache
 from src.Scraping.URLBuilder import URLBuilder
+from src.Storage.ListingStore import ListingStore
+
+
+class ScrapingError(Exception):
+    """Exception raised when a page could not be fetched."""
 
 
 class Scraper:
-    def __init__(self, url_strings: list[URLBuilder], page_limit: int) -> None:
+    def __init__(self, url_strings: list[URLBuilder], page_limit: int, connection_limit: int = 100,
+                 connection_limit_per_host: int = 10, dns_cache_ttl: int = 300, keepalive_timeout: float = 30,
+                 max_concurrent_requests: int = 10, parser: str = "lxml", parse_workers: int = 2,
+                 incremental: bool = False, database_path: Optional[str] = None, http_cache: bool = True,
+                 cache_ttl: float = 600, cache_max_size_mb: float = 100, offline: bool = False,
+                 resources_dir: Optional[str] = None, base_url: Optional[str] = None,
+                 record_dir: Optional[str] = None, requests_per_second: float = 5,
+                 max_requests_per_second: float = 20, max_retries: int = 4, retry_backoff: float = 1.0) -> None:
         """
         Scraper class for scraping data from OLX.
         :param url_strings: List of URLBuilder objects for scraping data.
         :param page_limit: Limit of pages to scrape for each URL.
+        :param connection_limit: Total number of simultaneous connections in the pool.
+        :param connection_limit_per_host: Number of simultaneous connections to a single host.
+        :param dns_cache_ttl: Time in seconds for which resolved DNS entries are cached.
+        :param keepalive_timeout: Time in seconds an idle connection is kept open for reuse.
+        :param max_concurrent_requests: Number of page requests allowed in flight at once, across all queries.
+        :param parser: Name of the listing parser backend ("lxml" or "html.parser").
+        :param parse_workers: Number of worker processes parsing pages, 0 parses inline on the event loop.
+        :param incremental: If True, paging stops once a page contains only listings known from the previous scrape.
+        :param database_path: Path to the SQLite database storing the scraped listings.
+        :param http_cache: If True, fetched pages are cached on disk and revalidated with ETag/Last-Modified.
+        :param cache_ttl: Time in seconds for which a cached page is used without contacting the server.
+        :param cache_max_size_mb: Maximum size of the page cache in megabytes.
+        :param offline: If True, pages are only served from the page cache, without any network access.
+        :param resources_dir: Directory for the scraping history, listing database and page cache.
+        :param base_url: Scheme and host replacing https://www.olx.pl in page URLs, e.g. of a ReplayServer.
+        :param record_dir: Directory to record the raw fetched pages into, for later replay.
+        :param requests_per_second: Initial rate of requests shared by all queries.
+        :param max_requests_per_second: Highest rate the adaptive rate limiter can speed up to.
+        :param max_retries: Number of retries of a page after throttling, server or connection errors.
+        :param retry_backoff: Base delay in seconds of the exponential backoff between retries.
         """
+        if max_retries < 0:
+            raise ValueError("max_retries must not be negative.")
         self.url_list = url_strings if url_strings else []
         self.page_limit = page_limit
-        self.data_frames = dict()
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.max_concurrent_requests = max_concurrent_requests
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        self.rate_limiter = RateLimiter(requests_per_second, burst=max_concurrent_requests,
+                                        max_requests_per_second=max_requests_per_second)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.failed_queries: dict[str, str] = dict()
+        self.progress = ScrapeProgress()
+        self._progress_callback: Optional[Callable[[ScrapeProgress], None]] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.parser = get_listing_parser(parser)
+        self.parse_workers = parse_workers
+        self._parse_executor: Optional[ProcessPoolExecutor] = None
         self.count_pattern = re.compile(r'Znaleźliśmy\s+(?:ponad\s+)?(\d+)\s+ogłosze(?:ń|nie|nia)')
         self.listings_counts = []
-        self.resources_dir = os.path.join(os.path.dirname(__file__), '../Resources')
+        self.resources_dir = resources_dir or os.path.join(os.path.dirname(__file__), '../Resources')
+        self.base_url = urlparse(base_url) if base_url else None
+        self.recorder = FixtureRecorder(record_dir) if record_dir else None
         self.scraping_history = self.load_scraping_history()
         self.last_scrape_date = datetime.fromisoformat(self.scraping_history[-1]['scrape_date']) if self.scraping_history else None
+        self.incremental = incremental
+        self.listing_store = ListingStore(database_path or os.path.join(self.resources_dir, 'listings.db'))
+        self.data_frames = self.listing_store.load_data_frames(
+            [url_builder.generate_data_key() for url_builder in self.url_list])
+        self.price_drops = pd.DataFrame()
+        self.response_cache = ResponseCache(os.path.join(self.resources_dir, 'http_cache'), cache_ttl,
+                                            cache_max_size_mb, offline) if http_cache or offline else None
 
     def add_url(self, url: URLBuilder) -> None:
         """
@@ -39,82 +107,352 @@ class Scraper:
         """
         self.url_list.append(url)
 
-    async def scrape_data(self, progress_callback: Callable[[int], None] = None) -> dict[str, pd.DataFrame]:
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared HTTP session, creating it on first use.
+        The session keeps a pool of keep-alive connections that is reused by all queries and pages.
+        :return: Shared aiohttp client session.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit, limit_per_host=self.connection_limit_per_host,
+                                             ttl_dns_cache=self.dns_cache_ttl, keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+            self._request_semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        return self._session
+
+    def get_parse_executor(self) -> ProcessPoolExecutor:
+        """
+        Returns the process pool used for parsing pages, creating it on first use.
+        :return: Process pool executor.
+        """
+        if self._parse_executor is None:
+            self._parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        return self._parse_executor
+
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session and releases the pooled connections and parsing processes.
+        :return:
+        """
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        self._request_semaphore = None
+
+    async def scrape_data(self, progress_callback: Callable[[ScrapeProgress], None] = None,
+                          batch_callback: Callable[[str, pd.DataFrame], None] = None) -> dict[str, pd.DataFrame]:
         """
         Scrapes data from the URLs asynchronously.
-        :param progress_callback: Callback function to update the progress bar.
+        :param progress_callback: Callback function receiving the progress and throughput of the scrape.
+        :param batch_callback: Callback function receiving the data key and data frame of every scraped page.
         :return: Dictionary of data frames with scraped data.
         """
-        self.data_frames = dict()
-        num_urls = len(self.url_list)
-        tasks = []
-        for i, url in enumerate(self.url_list):
-            tasks.append(self._fetch_data_from_url(url))
-            if progress_callback:
-                progress_callback(int((i + 1) / num_urls * 50))
-            await asyncio.sleep(0.1)  # Small delay to allow UI update
-
-        data = await asyncio.gather(*tasks)
-        for i, result, url_builder in zip(range(len(self.url_list)), data, self.url_list):
+        batches = {url_builder.generate_data_key(): [] for url_builder in self.url_list}
+        async for key, batch in self.stream_data(progress_callback):
+            batches[key].append(batch)
+            if batch_callback:
+                batch_callback(key, batch)
+        previous_data_frames, self.data_frames = self.data_frames, {}
+        for key, frames in batches.items():
+            if key not in self.failed_queries:
+                self.data_frames[key] = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            elif key in previous_data_frames:
+                self.data_frames[key] = previous_data_frames[key]  # Failed queries keep their previous data
+        return self.data_frames
+
+    async def stream_data(self, progress_callback: Callable[[ScrapeProgress], None] = None) -> AsyncIterator[tuple[str, pd.DataFrame]]:
+        """
+        Scrapes data from the URLs asynchronously, yielding every page as soon as it is parsed.
+        Pages are handed over through a bounded queue, so memory use depends on the batch size rather than
+        on the total number of listings. Each batch is staged in the listing store before it is yielded, and becomes
+        the query's stored snapshot once the whole query was scraped.
+        :param progress_callback: Callback function receiving the progress and throughput of the scrape, called
+        after every page. Progress is measured in pages fetched against pages expected from the listing counts.
+        :return: Asynchronous iterator of (data key, data frame with the listings of one page) tuples.
+        """
+        scrape_date = datetime.now()
+        self.failed_queries = dict()
+        self.progress = ScrapeProgress(pages_expected=len(self.url_list))
+        self._progress_callback = progress_callback
+        self._update_progress()
+        queue: asyncio.Queue[Optional[tuple[str, pd.DataFrame]]] = asyncio.Queue(maxsize=self.max_concurrent_requests)
+
+        async def scrape_query(url_builder: URLBuilder) -> None:
             key = url_builder.generate_data_key()
-            self.data_frames[key] = result
-            if progress_callback:
-                progress_callback(int((i + 1) / num_urls * 50 + 50))
-        self.last_scrape_date = datetime.now()
+            position = 0
+            committed = False
+            pages = self._iterate_listings(url_builder)
+            try:
+                async for listings in pages:
+                    if listings:
+                        batch = pd.DataFrame(listings)
+                        self.listing_store.stage_data_frame(key, batch, scrape_date, position)
+                        position += len(batch)
+                        self._update_progress(listings=len(batch))
+                        await queue.put((key, batch))
+                # The batches become the query's snapshot only once all of its pages were scraped
+                self.listing_store.commit_scrape(key, scrape_date)
+                committed = True
+            except Exception as e:
+                self.failed_queries[key] = str(e)  # A failed query does not discard the finished ones
+            finally:
+                await pages.aclose()  # Cancels the pages still being fetched if the stream was closed early
+                if not committed:
+                    self.listing_store.discard_scrape(key, scrape_date)
+
+        async def scrape_all_queries() -> None:
+            await asyncio.gather(*(scrape_query(url_builder) for url_builder in self.url_list))
+            await queue.put(None)
+
+        producer = asyncio.ensure_future(scrape_all_queries())
+        try:
+            while (item := await queue.get()) is not None:
+                yield item
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+        self.progress.finished = True
+        self._update_progress()
+        if self.url_list and len(self.failed_queries) == len(self.url_list):
+            raise ScrapingError("; ".join(f"{key}: {error}" for key, error in self.failed_queries.items()))
+        self.price_drops = self.listing_store.get_price_drops(since=scrape_date)
+        self.last_scrape_date = scrape_date
         self.save_scrape_date()
-        return self.data_frames
 
-    async def _fetch_data_from_url(self, url_builder: URLBuilder) -> pd.DataFrame:
+    def _update_progress(self, report: bool = True, **increments: Union[int, float]) -> None:
         """
-        Fetches data from the given URL.
-        :param url_builder: URLBuilder object to fetch data from.
-        :return: Data frame with the scraped data.
-        """
-        async with aiohttp.ClientSession() as session:
-            all_items = []
-            page = 1
-            while True:
-                site_url = urlparse(url_builder.build_url(page))
-                async with session.get(site_url.geturl()) as response:
-                    if response.status == 200:
-                        soup = BeautifulSoup(await response.text(), "html.parser")
-                        items = soup.find_all("div", {"data-cy": "l-card"})
-                        all_items.extend(items)
-                        count = self.find_count(soup)
-
-                        if page >= self.page_limit or len(all_items) >= count:
-                            break  # Break if there are no more pages
-                        page += 1
-                    else:
-                        raise Exception(f"Error: {response.status} for {site_url.geturl()}")
-
-            return pd.DataFrame(self._process_item(item) for item in all_items) if all_items else pd.DataFrame()
+        Increments the counters of the scrape progress and reports a snapshot of it to the progress callback.
+        :param report: If False, the counters are only updated, without calling the progress callback.
+        :param increments: Amounts to add to the ScrapeProgress fields with the same names.
+        :return:
+        """
+        for name, increment in increments.items():
+            setattr(self.progress, name, getattr(self.progress, name) + increment)
+        self.progress.updated_at = time.monotonic()
+        if report and self._progress_callback:
+            self._progress_callback(replace(self.progress))
+
+    async def _fetch_page(self, url: str, headers: Optional[dict[str, str]] = None) -> tuple[Optional[str], Mapping[str, str]]:
+        """
+        Fetches a single page, waiting for the rate limiter and a free slot in the global request budget.
+        Throttled (429), server (5xx) and connection errors are retried with exponential backoff and jitter.
+        :param url: URL of the page to fetch.
+        :param headers: Additional request headers.
+        :return: HTML content of the page, None if the server responded with 304 Not Modified, and the response headers.
+        """
+        session = await self.get_session()
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            retry_after = None
+            try:
+                async with self._request_semaphore:
+                    async with session.get(url, headers=headers) as response:
+                        self._update_progress(report=False, requests=1)
+                        if response.status == 304:
+                            self.rate_limiter.on_success()
+                            return None, response.headers
+                        if response.status == 200:
+                            body = await response.read()
+                            html = body.decode(response.get_encoding())
+                            self._update_progress(report=False, bytes_downloaded=len(body))
+                            self.rate_limiter.on_success()
+                            if self.recorder:
+                                self.recorder.record(str(response.url), html)
+                            return html, response.headers
+                        if response.status != 429 and response.status < 500:
+                            raise ScrapingError(f"Error: {response.status} for {url}")
+                        error = ScrapingError(f"Error: {response.status} for {url}")
+                        retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = ScrapingError(f"Error: {e!r} for {url}")
+            self.rate_limiter.on_throttle(retry_after)
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_after or random.uniform(0, self.retry_backoff * 2 ** attempt))
+        raise error
 
     @staticmethod
-    def _process_item(item: bs4.element.Tag) -> dict:
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        Parses the value of the Retry-After header.
+        :param value: Header value, either a number of seconds or an HTTP date.
+        :return: Time in seconds to wait, None if the header is missing or malformed.
+        """
+        if not value:
+            return None
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    async def _parse_page(self, html: str) -> ParsedPage:
         """
-        Processes an item from the scraped data.
-        :param item: Item to process.
-        :return: Dictionary with the processed item data.
+        Parses a page in the process pool so that the event loop keeps downloading meanwhile.
+        :param html: HTML content of the page.
+        :return: Parsed page with plain dictionary rows.
+        """
+        start = time.perf_counter()
+        if self.parse_workers <= 0:
+            parsed_page = self.parser.parse(html)
+        else:
+            loop = asyncio.get_running_loop()
+            parsed_page = await loop.run_in_executor(self.get_parse_executor(), parse_page, html, self.parser.name)
+        self._update_progress(report=False, pages_parsed=1, parse_seconds=time.perf_counter() - start)
+        return parsed_page
+
+    def _page_url(self, url_builder: URLBuilder, page: int) -> str:
+        """
+        Builds the URL of a page of the given query, pointing it at the base URL if one is set.
+        :param url_builder: URLBuilder object of the query.
+        :param page: Page number.
+        :return: URL of the page.
+        """
+        site_url = urlparse(url_builder.build_url(page))
+        if self.base_url:
+            site_url = site_url._replace(scheme=self.base_url.scheme, netloc=self.base_url.netloc)
+        return site_url.geturl()
+
+    async def _fetch_and_parse_page(self, url_builder: URLBuilder, page: int) -> ParsedPage:
+        """
+        Fetches and parses a single page of the given query and reports it to the progress callback.
+        :param url_builder: URLBuilder object of the query.
+        :param page: Page number.
+        :return: Parsed page with plain dictionary rows.
+        """
+        parsed_page = await self._load_page(url_builder, page)
+        self._update_progress(pages_fetched=1)
+        return parsed_page
+
+    async def _fetch_first_page(self, url_builder: URLBuilder) -> tuple[ParsedPage, int]:
+        """
+        Fetches and parses the first page of the given query, which tells how many pages the query has.
+        The remaining pages are added to the expected pages before the first page is reported as fetched,
+        so the reported progress never moves back.
+        :param url_builder: URLBuilder object of the query.
+        :return: Parsed first page and the number of pages of the query to fetch.
+        """
+        parsed_page = await self._load_page(url_builder, 1)
+        page_count = self._page_count(parsed_page)
+        self._update_progress(pages_expected=page_count - 1, pages_fetched=1)
+        return parsed_page, page_count
+
+    def _page_count(self, first_page: ParsedPage) -> int:
+        """
+        Returns the number of pages of a query to fetch, from the listing count on its first page and the page limit.
+        :param first_page: Parsed first page of the query.
+        :return: Number of pages, at least 1 since the first page is fetched even if the listing count is unknown.
+        """
+        count = self.find_count(first_page.count_text)
+        page_size = len(first_page.listings)
+        return max(1, min(self.page_limit, math.ceil(count / page_size))) if page_size else 1
+
+    async def _load_page(self, url_builder: URLBuilder, page: int) -> ParsedPage:
+        """
+        Loads a single page of the given query from the page cache or the network.
+        Pages found in the page cache are reused without parsing when fresh or confirmed unchanged by the server.
+        :param url_builder: URLBuilder object of the query.
+        :param page: Page number.
+        :return: Parsed page with plain dictionary rows.
+        """
+        url = self._page_url(url_builder, page)
+        if self.response_cache is None:
+            html, _ = await self._fetch_page(url)
+            return await self._parse_page(html)
+
+        entry = self.response_cache.get(url)
+        if entry is None and self.response_cache.offline:
+            raise ScrapingError(f"Error: no cached response for {url} in offline mode")
+        if entry is None or not self.response_cache.is_fresh(entry):
+            html, headers = await self._fetch_page(url, self.response_cache.conditional_headers(entry))
+            if html is None:
+                self.response_cache.refresh(url, entry)
+            else:
+                parsed_page = await self._parse_page(html)
+                self.response_cache.put(url, html, headers.get('ETag'), headers.get('Last-Modified'),
+                                        {'parser': self.parser.name, **asdict(parsed_page)})
+                return parsed_page
+
+        parsed = entry['parsed']
+        if parsed and parsed['parser'] == self.parser.name:
+            return ParsedPage(parsed['listings'], parsed['count_text'])
+        return await self._parse_page(entry['html'])
+
+    def _iterate_listings(self, url_builder: URLBuilder) -> AsyncGenerator[list[dict], None]:
+        """
+        Iterates over the listings of the given query page by page.
+        :param url_builder: URLBuilder object to fetch data from.
+        :return: Asynchronous generator of listing rows, one list per page.
+        """
+        cached_items = self.listing_store.load_data_frame(url_builder.generate_data_key()).to_dict(
+            orient='records') if self.incremental else []
+        if cached_items:
+            return self._iterate_new_listings(url_builder, cached_items)
+        return self._iterate_all_listings(url_builder)
+
+    async def _iterate_all_listings(self, url_builder: URLBuilder) -> AsyncIterator[list[dict]]:
+        """
+        Iterates over all listings of the given query up to the page limit.
+        The first page is fetched alone to learn the total number of listings, the remaining pages
+        are then fetched concurrently and yielded in page order.
+        :param url_builder: URLBuilder object to fetch data from.
+        :return: Asynchronous iterator of listing rows, one list per page.
+        """
+        first_page, page_count = await self._fetch_first_page(url_builder)
+        yield first_page.listings
+
+        pages = [asyncio.ensure_future(self._fetch_and_parse_page(url_builder, page))
+                 for page in range(2, page_count + 1)]
+        try:
+            for parsed_page in pages:
+                yield (await parsed_page).listings
+        finally:
+            for parsed_page in pages:
+                parsed_page.cancel()
+
+    async def _iterate_new_listings(self, url_builder: URLBuilder, cached_items: list[dict]) -> AsyncIterator[list[dict]]:
+        """
+        Iterates over pages of the given query one by one until a page contains only already known listings,
+        then yields the cached listings that were not fetched again.
+        Relies on the results being ordered from the newest, as requested by URLBuilder.
+        :param url_builder: URLBuilder object to fetch data from.
+        :param cached_items: Listing rows from the previous scrape of the query.
+        :return: Asynchronous iterator of listing rows, one list per page followed by one list of cached rows.
         """
-        title = item.find("h6").text.strip()
-        price = format_price(item.find("p").text)
-        location, date = format_location_date(item.find("p", {"data-testid": "location-date"}).text) if item.find("p",
-            {"data-testid": "location-date"}) else ("", "")
-        photo = item.find("img").get("src") if item.find("img") else ""
-        item_url = urljoin("https://www.olx.pl", item.find("a").get("href"))
+        known_urls = {item["Item URL"] for item in cached_items}
+        fetched_urls = set()
+        page = 1
+        parsed_page, page_count = await self._fetch_first_page(url_builder)
+        page_size = len(parsed_page.listings)
+        while True:
+            fetched_urls.update(item["Item URL"] for item in parsed_page.listings)
+            yield parsed_page.listings
+            if page >= page_count or all(item["Item URL"] in known_urls for item in parsed_page.listings):
+                self._update_progress(pages_expected=page - page_count)
+                break  # Break if the rest of the results is already known
+            page += 1
+            parsed_page = await self._fetch_and_parse_page(url_builder, page)
 
-        return {"Title": title, "Price": price, "Location": location, "Date": date, "Item URL": item_url,
-                "Photo": photo}
+        cached_items = [item for item in cached_items if item["Item URL"] not in fetched_urls]
+        yield cached_items[:max(0, self.page_limit * page_size - len(fetched_urls))] if page_size else cached_items
 
-    def find_count(self, soup: BeautifulSoup) -> int:
+    def find_count(self, count_text: Optional[str]) -> int:
         """
         Finds the number of listings on the page.
-        :param soup: Soup object to search for the count.
+        :param count_text: Text of the total count element, None if the page has no such element.
         :return: Number of listings on the page.
         """
-        count_element = soup.find("span", {"data-testid": "total-count"})
-        count = int(self.count_pattern.search(count_element.text).group(1))
+        match = self.count_pattern.search(count_text) if count_text else None
+        if match is None:
+            return 0
+        count = int(match.group(1))
         self.listings_counts.append(count)
         return count
 
@@ -0,0 +1,252 @@
+import hashlib
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Iterable, Optional
+
+import pandas as pd
+
+
+class ListingStore:
+    """Class for persisting scraped listings in a local SQLite database."""
+    COLUMNS = {"Title": "title", "Price": "price", "Location": "location", "Date": "date", "Item URL": "item_url",
+               "Photo": "photo"}
+
+    def __init__(self, database_path: str) -> None:
+        """
+        Initializes the ListingStore and creates the database schema if it does not exist yet.
+        :param database_path: Path to the SQLite database file.
+        """
+        self.database_path = database_path
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection to the database. A connection is opened per operation, so the store
+        can be used from any thread.
+        :return: SQLite connection.
+        """
+        return sqlite3.connect(self.database_path)
+
+    def _create_schema(self) -> None:
+        """
+        Creates the listings and price history tables and their indexes.
+        :return:
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    item_url TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    title TEXT,
+                    price INTEGER,
+                    location TEXT,
+                    date TEXT,
+                    photo TEXT,
+                    position INTEGER,
+                    content_hash TEXT,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    PRIMARY KEY (item_url, query_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_listings_query_key ON listings (query_key, last_seen);
+                CREATE INDEX IF NOT EXISTS idx_listings_price ON listings (price);
+                CREATE INDEX IF NOT EXISTS idx_listings_date ON listings (date);
+                CREATE TABLE IF NOT EXISTS price_history (
+                    item_url TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    price INTEGER,
+                    previous_price INTEGER,
+                    seen_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_price_history_listing ON price_history (item_url, query_key, seen_at);
+                CREATE INDEX IF NOT EXISTS idx_price_history_seen_at ON price_history (seen_at);
+                CREATE TABLE IF NOT EXISTS pending_listings (
+                    query_key TEXT NOT NULL,
+                    scrape_date TEXT NOT NULL,
+                    position INTEGER,
+                    title TEXT,
+                    price INTEGER,
+                    location TEXT,
+                    date TEXT,
+                    item_url TEXT NOT NULL,
+                    photo TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_pending_listings_scrape ON pending_listings (query_key, scrape_date);
+            """)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(listings)")}
+            if "content_hash" not in columns:  # Databases created before change detection was added
+                connection.execute("ALTER TABLE listings ADD COLUMN content_hash TEXT")
+
+    @staticmethod
+    def _hash_listing(title: str, price: int, location: str, date: str, photo: str) -> str:
+        """
+        Computes a hash of the listing content, used to detect listings that changed since the previous scrape.
+        :param title: Title of the listing.
+        :param price: Price of the listing.
+        :param location: Location of the listing.
+        :param date: Date of the listing.
+        :param photo: Photo URL of the listing.
+        :return: Hex digest of the listing content.
+        """
+        content = "\x1f".join(str(value) for value in (title, price, location, date, photo))
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+    def stage_data_frame(self, query_key: str, df: pd.DataFrame, scrape_date: datetime, first_position: int = 0) -> None:
+        """
+        Stores a batch of the listings of a scrape that is still running. Staged listings are not part of the query's
+        snapshot until commit_scrape is called, so a scrape that fails or is cancelled halfway leaves the previous
+        snapshot intact.
+        :param query_key: Data key of the query.
+        :param df: Data frame with a batch of the scraped listings.
+        :param scrape_date: Date of the scrape.
+        :param first_position: Position of the first listing of the data frame in the results.
+        :return:
+        """
+        if df.empty:
+            return
+        rows = [(query_key, scrape_date.isoformat(), position, *row) for position, row in enumerate(
+            df[list(self.COLUMNS)].itertuples(index=False, name=None), start=first_position)]
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("""
+                INSERT INTO pending_listings (query_key, scrape_date, position, title, price, location, date, item_url,
+                                              photo)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def commit_scrape(self, query_key: str, scrape_date: datetime) -> None:
+        """
+        Makes the listings staged by a finished scrape the new snapshot of the query, in a single transaction.
+        Staged listings left over by older scrapes of the query that never finished are dropped.
+        :param query_key: Data key of the query.
+        :param scrape_date: Date of the scrape.
+        :return:
+        """
+        with closing(self._connect()) as connection, connection:
+            rows = connection.execute("""
+                SELECT title, price, location, date, item_url, photo FROM pending_listings
+                WHERE query_key = ? AND scrape_date = ? ORDER BY position
+            """, (query_key, scrape_date.isoformat())).fetchall()
+            self._write_listings(connection, query_key, rows, scrape_date)
+            connection.execute("DELETE FROM pending_listings WHERE query_key = ? AND scrape_date <= ?",
+                               (query_key, scrape_date.isoformat()))
+
+    def discard_scrape(self, query_key: str, scrape_date: datetime) -> None:
+        """
+        Drops the listings staged by a scrape that failed or was cancelled.
+        :param query_key: Data key of the query.
+        :param scrape_date: Date of the scrape.
+        :return:
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM pending_listings WHERE query_key = ? AND scrape_date = ?",
+                               (query_key, scrape_date.isoformat()))
+
+    def _write_listings(self, connection: sqlite3.Connection, query_key: str, rows: Iterable[tuple],
+                        scrape_date: datetime) -> None:
+        """
+        Upserts the listings of a query and records their price changes. The listings are diffed against the stored
+        snapshot by content hash, only new and changed listings are written in full, unchanged ones just have
+        last_seen and position updated. New listings and price changes are recorded in the price history.
+        :param connection: Connection of the transaction to write in.
+        :param query_key: Data key of the query.
+        :param rows: (title, price, location, date, item URL, photo) tuples in result order.
+        :param scrape_date: Date of the scrape.
+        :return:
+        """
+        scrape_date = scrape_date.isoformat()
+        stored = {item_url: (content_hash, price) for item_url, content_hash, price in connection.execute(
+            "SELECT item_url, content_hash, price FROM listings WHERE query_key = ?", (query_key,))}
+
+        changed_rows, unchanged_rows, price_rows = [], [], []
+        for position, (title, price, location, date, item_url, photo) in enumerate(rows):
+            price = int(price)
+            content_hash = self._hash_listing(title, price, location, date, photo)
+            stored_hash, stored_price = stored.get(item_url, (None, None))
+            stored[item_url] = (content_hash, price)  # A listing repeated on a later page is not a change
+            if content_hash == stored_hash:
+                unchanged_rows.append((position, scrape_date, item_url, query_key))
+                continue
+            changed_rows.append((item_url, query_key, title, price, location, date, photo, position, content_hash,
+                                 scrape_date, scrape_date))
+            if price != stored_price:
+                price_rows.append((item_url, query_key, price, stored_price, scrape_date))
+
+        connection.executemany("""
+            INSERT INTO listings (item_url, query_key, title, price, location, date, photo, position, content_hash,
+                                  first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (item_url, query_key) DO UPDATE SET
+                title = excluded.title, price = excluded.price, location = excluded.location,
+                date = excluded.date, photo = excluded.photo, position = excluded.position,
+                content_hash = excluded.content_hash, last_seen = excluded.last_seen
+        """, changed_rows)
+        connection.executemany("""
+            UPDATE listings SET position = ?, last_seen = ? WHERE item_url = ? AND query_key = ?
+        """, unchanged_rows)
+        connection.executemany("""
+            INSERT INTO price_history (item_url, query_key, price, previous_price, seen_at) VALUES (?, ?, ?, ?, ?)
+        """, price_rows)
+
+    def load_data_frame(self, query_key: str) -> pd.DataFrame:
+        """
+        Loads the listings found by the most recent scrape of a query.
+        :param query_key: Data key of the query.
+        :return: Data frame with the listings, empty if the query was never scraped.
+        """
+        columns = ", ".join(f'{column} AS "{name}"' for name, column in self.COLUMNS.items())
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(f"""
+                SELECT {columns} FROM listings
+                WHERE query_key = ? AND last_seen = (SELECT MAX(last_seen) FROM listings WHERE query_key = ?)
+                ORDER BY position
+            """, connection, params=(query_key, query_key))
+
+    def load_data_frames(self, query_keys: list[str]) -> dict[str, pd.DataFrame]:
+        """
+        Loads the listings found by the most recent scrape of each of the given queries.
+        :param query_keys: Data keys of the queries.
+        :return: Dictionary of data frames keyed by the data key, queries never scraped are left out.
+        """
+        data_frames = {key: self.load_data_frame(key) for key in query_keys}
+        return {key: df for key, df in data_frames.items() if not df.empty}
+
+    def get_price_history(self, item_url: str, query_key: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns the price series of a listing, one row per observed price change.
+        :param item_url: URL of the listing.
+        :param query_key: Data key of the query, if None the series of all queries the listing was found by are merged.
+        :return: Data frame with the Date and Price columns ordered by date.
+        """
+        query = "SELECT seen_at AS \"Date\", price AS \"Price\" FROM price_history WHERE item_url = ?"
+        params = [item_url]
+        if query_key is not None:
+            query += " AND query_key = ?"
+            params.append(query_key)
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query + " ORDER BY seen_at", connection, params=params)
+
+    def get_price_drops(self, since: Optional[datetime] = None, query_key: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns the price drop events, using the previous price stored with each price change
+        so the full history does not need to be scanned.
+        :param since: Only return drops observed at or after this date, all drops if None.
+        :param query_key: Only return drops of this query, drops of all queries if None.
+        :return: Data frame with the Item URL, Query, Title, Previous Price, Price and Date columns, newest first.
+        """
+        query = """
+            SELECT history.item_url AS "Item URL", history.query_key AS "Query", listings.title AS "Title",
+                   history.previous_price AS "Previous Price", history.price AS "Price", history.seen_at AS "Date"
+            FROM price_history AS history
+            JOIN listings ON listings.item_url = history.item_url AND listings.query_key = history.query_key
+            WHERE history.price < history.previous_price
+        """
+        params = []
+        if since is not None:
+            query += " AND history.seen_at >= ?"
+            params.append(since.isoformat())
+        if query_key is not None:
+            query += " AND history.query_key = ?"
+            params.append(query_key)
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query + " ORDER BY history.seen_at DESC", connection, params=params)
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from src.Exporting.ExportManager import ExportFormat, ExportManager
+from src.Resources.utils import load_config
+from src.Scraping.ScrapeProgress import ProgressLogger
+from src.Scraping.Scraper import Scraper, ScrapingError
+from src.Scraping.URLBuilder import URLBuilder
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'Resources/config.json')
+
+
+def create_scraper(config: dict) -> Scraper:
+    """
+    Create a Scraper for the search queries of the configuration.
+    :param config: Application configuration
+    :return: Scraper object
+    """
+    search_items = [URLBuilder(**query) for query in config['search_queries']]
+    return Scraper(search_items, config['gui_config']['page_limit'], **config.get('scraper_config', {}))
+
+
+def export_data(output_config: dict, data_frames: dict[str, pd.DataFrame], export_format: ExportFormat,
+                output_dir: str) -> None:
+    """
+    Export the data frames to the given directory.
+    :param output_config: Configuration for the output file
+    :param data_frames: Data frames to export
+    :param export_format: Format of the output file
+    :param output_dir: Directory to save the output file to
+    :return:
+    """
+    output_config = {**output_config, 'filename': str(Path(output_dir) / output_config['filename'])}
+    ExportManager(export_format, output_config, data_frames).export_data()
+
+
+def report_failures(scraper: Scraper) -> None:
+    """
+    Print the queries that failed during the last scrape.
+    :param scraper: Scraper object
+    :return:
+    """
+    for key, error in scraper.failed_queries.items():
+        print(f"Failed to scrape {key}: {error}", file=sys.stderr)
+
+
+async def scrape_once(config: dict, export_format: Optional[ExportFormat], output_dir: str, quiet: bool) -> int:
+    """
+    Scrape all search queries once and export the results.
+    :param config: Application configuration
+    :param export_format: Format of the output file, None to skip exporting
+    :param output_dir: Directory to save the output file to
+    :param quiet: If True, the progress is not printed
+    :return: Exit code, 0 if every query was scraped
+    """
+    scraper = create_scraper(config)
+    try:
+        data_frames = await scraper.scrape_data(None if quiet else ProgressLogger())
+    except ScrapingError as e:
+        print(f"Scraping failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await scraper.close()
+    report_failures(scraper)
+    if export_format is not None:
+        export_data(config['output_config'], data_frames, export_format, output_dir)
+    return 1 if scraper.failed_queries else 0
+
+
+async def run_daemon(config: dict, export_format: Optional[ExportFormat], output_dir: str, quiet: bool) -> int:
+    """
+    Re-scrape the search queries on a schedule until SIGINT or SIGTERM is received.
+    Every query is scraped at the interval set for its data key in the daemon_config section of the configuration,
+    or at the default interval. After each run the latest data of all queries is exported.
+    :param config: Application configuration
+    :param export_format: Format of the output file, None to skip exporting
+    :param output_dir: Directory to save the output file to
+    :param quiet: If True, the progress is not printed
+    :return: Exit code
+    """
+    daemon_config = config.get('daemon_config', {})
+    default_interval = daemon_config.get('default_interval_minutes', 60) * 60
+    query_intervals = {key: minutes * 60 for key, minutes in daemon_config.get('query_intervals', {}).items()}
+
+    scraper = create_scraper(config)
+    url_builders = list(scraper.url_list)
+    keys = [url_builder.generate_data_key() for url_builder in url_builders]
+    next_runs = {key: 0.0 for key in keys}
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop_event.set)
+        except NotImplementedError:  # Signal handlers are not supported by the Windows event loop
+            pass
+
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            due = [url_builder for url_builder, key in zip(url_builders, keys) if next_runs[key] <= now]
+            if due:
+                scraper.url_list = due
+                if not quiet:
+                    print(f"Scraping {len(due)} of {len(url_builders)} queries", file=sys.stderr)
+                try:
+                    await scraper.scrape_data(None if quiet else ProgressLogger())
+                except ScrapingError as e:
+                    print(f"Scraping failed: {e}", file=sys.stderr)
+                report_failures(scraper)
+                for url_builder in due:
+                    key = url_builder.generate_data_key()
+                    next_runs[key] = now + query_intervals.get(key, default_interval)
+                if export_format is not None:
+                    data_frames = scraper.listing_store.load_data_frames(keys)
+                    await asyncio.to_thread(export_data, config['output_config'], data_frames, export_format,
+                                            output_dir)
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), max(0.0, min(next_runs.values()) - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await scraper.close()
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Headless entry point, scraping and exporting without the GUI.
+    :param argv: Command line arguments, sys.argv if None
+    :return: Exit code
+    """
+    parser = argparse.ArgumentParser(description="Scrape OLX search queries without the GUI.")
+    parser.add_argument('mode', choices=['scrape', 'daemon'],
+                        help="scrape once, or keep scraping on the schedule from daemon_config")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_PATH, help="Configuration file with the search queries")
+    parser.add_argument('--format', choices=[export_format.value for export_format in ExportFormat],
+                        help="Export format, the format from output_config if not given")
+    parser.add_argument('--output-dir', default='.', help="Directory to export the data to")
+    parser.add_argument('--no-export', action='store_true', help="Only scrape and store the data")
+    parser.add_argument('--quiet', action='store_true', help="Do not print the progress")
+    arguments = parser.parse_args(argv)
+
+    config = load_config(arguments.config)
+    export_format = None if arguments.no_export else ExportFormat(arguments.format or config['output_config']['format'])
+    run = scrape_once if arguments.mode == 'scrape' else run_daemon
+    return asyncio.run(run(config, export_format, arguments.output_dir, arguments.quiet))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
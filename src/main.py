@@ -35,6 +35,8 @@ def create_app(app_title: str, width: int, height: int, fontsize: int, dark_mode
     else:
         app.setStyle("Windows")
 
+    app.aboutToQuit.connect(controller.shutdown)
+
     main_window = MainWindow(app_title, width, height, controller)
     sys.exit(app.exec_())
 
@@ -49,7 +51,7 @@ def main() -> None:
     output_config = config['output_config']
 
     search_items = [URLBuilder(**query) for query in config['search_queries']]
-    scraper_instance = Scraper(search_items, gui_config['page_limit'])
+    scraper_instance = Scraper(search_items, gui_config['page_limit'], **config.get('scraper_config', {}))
     controller = Controller(scraper_instance, output_config)
 
     create_app(gui_config['app_title'], gui_config['width'], gui_config['height'], gui_config['fontsize'],
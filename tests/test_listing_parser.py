@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from src.Scraping.ListingParser import BeautifulSoupListingParser, LxmlListingParser
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "olx_search_page.html")
+
+
+@pytest.fixture
+def search_page_html() -> str:
+    with open(FIXTURE_PATH, encoding="utf-8") as file:
+        return file.read()
+
+
+def test_lxml_parser_matches_beautifulsoup_parser(search_page_html: str) -> None:
+    lxml_page = LxmlListingParser().parse(search_page_html)
+    soup_page = BeautifulSoupListingParser().parse(search_page_html)
+
+    assert lxml_page == soup_page
+    assert len(lxml_page.listings) == 4
+
+
+def test_parser_output(search_page_html: str) -> None:
+    page = LxmlListingParser().parse(search_page_html)
+
+    assert page.listings[0] == {
+        "Title": "Rower gravel Kross Esker & sakwy",
+        "Price": 2450,
+        "Location": "Wrocław, Krzyki",
+        "Date": "12 października 2026",
+        "Item URL": "https://www.olx.pl/d/oferta/rower-gravel-kross-esker-CID767-ID101.html",
+        "Photo": "https://ireland.apollo.olxcdn.com/v1/files/101/image;s=216x152",
+    }
+    assert page.listings[2]["Photo"] == ""
+    assert (page.listings[3]["Location"], page.listings[3]["Date"]) == ("", "")